@@ -12,11 +12,66 @@ case "$1" in
     NEW_ADMIN_PASSWORD="$2" python3 reset_admin_password.py
     ;;
   migrate-db)
-    echo "Running DB migrations (create all tables if missing)"
-    python3 -c "from app import db, app; ctx = app.app_context(); ctx.push(); db.create_all(); ctx.pop()"
+    echo "Running DB migrations (alembic upgrade to the latest revision)"
+    python3 -m flask --app 'models:create_db_app(migrations=True)' db upgrade
+    ;;
+  check-query-plans)
+    # Exits 1 if a hot endpoint query scans a whole table
+    python3 check_query_plans.py "${@:2}"
+    ;;
+  check-query-counts)
+    # Exits 1 if /elections or /admin/election_summary issue more queries as data grows
+    python3 check_query_counts.py "${@:2}"
+    ;;
+  reconcile-tallies)
+    # Pass --check to only report drift (exits 1 if any counter is off)
+    python3 reconcile_tallies.py "${@:2}"
+    ;;
+  import-voters)
+    if [ -z "$2" ]; then
+      echo "Usage: $0 import-voters <voters.csv|voters.jsonl> [--chunk-size N] [--workers N]"
+      exit 1
+    fi
+    python3 voter_import.py "${@:2}"
+    ;;
+  ingest-ballots)
+    if [ -z "$2" ]; then
+      echo "Usage: $0 ingest-ballots <ballots.csv|ballots.jsonl> [--report results.jsonl] [--chunk-size N]"
+      exit 1
+    fi
+    python3 ballot_ingest.py "${@:2}"
+    ;;
+  export)
+    if [ -z "$2" ]; then
+      echo "Usage: $0 export <ballots|tallies> --output <file> [--format csv|jsonl|parquet] [--election ID] [--include-voters]"
+      exit 1
+    fi
+    python3 audit_export.py "${@:2}"
+    ;;
+  backup)
+    # Online snapshot of the live SQLite database (safe while voting continues)
+    python3 db_backup.py backup "${@:2}"
+    ;;
+  verify-backup)
+    if [ -z "$2" ]; then
+      echo "Usage: $0 verify-backup <backup.db.gz>"
+      exit 1
+    fi
+    python3 db_backup.py verify "$2"
+    ;;
+  restore)
+    if [ -z "$2" ]; then
+      echo "Usage: $0 restore <backup.db.gz> [--yes]"
+      exit 1
+    fi
+    python3 db_backup.py restore "${@:2}"
+    ;;
+  mail-worker)
+    echo "Starting mail dispatcher worker (run the API with MAIL_DISPATCHER=off)"
+    python3 mail_queue.py
     ;;
   *)
-    echo "Usage: $0 {reset-admin-password <newpassword>|migrate-db}"
+    echo "Usage: $0 {reset-admin-password <newpassword>|migrate-db|check-query-plans [--verbose]|check-query-counts|reconcile-tallies [--check]|import-voters <file>|ingest-ballots <file>|export <ballots|tallies> --output <file>|backup [--keep N]|verify-backup <file>|restore <file> --yes|mail-worker}"
     exit 1
     ;;
 esac
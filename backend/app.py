@@ -1,52 +1,117 @@
-from flask import Flask, request, jsonify
+import logging
+import multiprocessing
+import os
+import uuid
+
+from flask import Blueprint, Response, current_app, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.exc import IntegrityError
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-app = Flask(__name__)
-CORS(app)
-import os
-# Use absolute path for SQLite DB
-DB_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'voting.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
-db = SQLAlchemy(app)
-
-# Models
-class User(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
-    role = db.Column(db.String(16), nullable=False, default='user')  # 'admin' or 'user'
-
-class Election(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(120), nullable=False)
-
-class Candidate(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(80), nullable=False)
-    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), nullable=False)
-    photo_url = db.Column(db.String(256), nullable=True)  # URL or filename for candidate photo
-
-class Vote(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), nullable=False)
-    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id'), nullable=False)
-    __table_args__ = (db.UniqueConstraint('user_id', 'election_id', name='unique_vote'),)
-
-class Settings(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    smtp_host = db.Column(db.String(128))
-    smtp_port = db.Column(db.Integer)
-    smtp_user = db.Column(db.String(128))
-    smtp_password = db.Column(db.String(128))
-    smtp_from = db.Column(db.String(128))
-    smtp_tls = db.Column(db.Boolean, default=True)
+from auth import TokenAuth, load_secret_key
+from live_results import TallyWatcher
+from log_config import init_request_logging
+from mail_queue import MailDispatcher
+from metrics import RequestMetrics
+from models import (Candidate, CandidateTally, Election, ElectionStats, MailOutbox, Settings, User, Vote,
+                    bump_revision, create_db_app, db, record_votes)
+from password_hashing import HasherBusy, PasswordHasher
+from rate_limit import RateLimiter
+from response_cache import ResponseCache
+import audit_export
+import ballot_ingest
+import db_backup
+import voter_import
+
+log = logging.getLogger('voting')
+
+# All routes; create_app() registers them
+api = Blueprint('api', __name__)
+
+# The services below are created at import but bound to an app by create_app()
+
+# Latency/SQL/in-flight metrics for every route, served at /metrics
+request_metrics = RequestMetrics.from_env()
+
+# Background mail delivery; set MAIL_DISPATCHER=off when running `python3 mail_queue.py` as a separate worker
+mail_dispatcher = MailDispatcher(db, MailOutbox, Settings, observe_send=request_metrics.observe_smtp_send)
+MAIL_DISPATCHER_MODE = os.environ.get('MAIL_DISPATCHER', 'thread')
+
+# Cached read endpoints; every write below invalidates the namespaces it affects
+response_cache = ResponseCache.from_env()
+
+# Signed session tokens from /login; sent back as `Authorization: Bearer <token>`
+token_auth = TokenAuth(max_age=int(os.environ.get('AUTH_TOKEN_MAX_AGE', 12 * 3600)))
+admin_required = token_auth.admin_required
+
+# Token-bucket limits on /login, /register and /vote (RATE_LIMIT_*)
+rate_limiter = RateLimiter.from_env()
+
+# Password hashing and checks run in a small process pool (PASSWORD_HASH_*)
+password_hasher = PasswordHasher.from_env()
+
+@api.app_errorhandler(HasherBusy)
+def hasher_busy(e):
+    return jsonify({'message': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
+
+def find_credentials(username):
+    """Load a user's login fields, then end the transaction so no connection is held while hashing."""
+    row = db.session.execute(
+        db.select(User.id, User.username, User.password_hash, User.role).filter_by(username=username)
+    ).first()
+    db.session.rollback()
+    return row
+
+def replace_password_hash(user, new_hash):
+    # Only replace the hash that was verified, in case the password changed meanwhile
+    User.query.filter_by(id=user.id, password_hash=user.password_hash).update({'password_hash': new_hash})
+    db.session.commit()
+
+def election_tally(election_id):
+    """Return [(candidate, votes)] for an election from the materialized counters."""
+    return (
+        db.session.query(Candidate, db.func.coalesce(CandidateTally.votes, 0))
+        .outerjoin(CandidateTally, CandidateTally.candidate_id == Candidate.id)
+        .filter(Candidate.election_id == election_id)
+        .order_by(Candidate.id)
+        .all()
+    )
+
+def results_payload(election_id):
+    return {c.name: {'votes': votes, 'photo_url': c.photo_url} for c, votes in election_tally(election_id)}
+
+def election_versions(election_ids):
+    rows = db.session.query(ElectionStats.election_id, ElectionStats.total_votes + ElectionStats.revision).filter(
+        ElectionStats.election_id.in_(election_ids))
+    return dict(rows.all())
+
+def can_view_results(claims):
+    return bool(claims) and claims['username'] == 'kantwi' and claims['role'] == 'admin'
+
+# Live results: one watcher thread per process polls the version counters for watched elections
+tally_watcher = TallyWatcher(election_versions, results_payload,
+                             interval=float(os.environ.get('LIVE_RESULTS_INTERVAL', 1.0)))
+
+def start_backup_scheduler(app):
+    """Optional scheduled online backups (SQLite only); see db_backup.py"""
+    interval = float(os.environ.get('BACKUP_INTERVAL_MINUTES', 0))
+    if interval <= 0 or multiprocessing.parent_process() is not None:
+        return None
+    with app.app_context():
+        try:
+            scheduler = db_backup.BackupScheduler(
+                db_backup.sqlite_path(db.engine),
+                os.environ.get('BACKUP_DIR') or os.path.join(app.instance_path, 'backups'),
+                interval * 60, keep=int(os.environ.get('BACKUP_KEEP', 14)))
+        except db_backup.BackupError as e:
+            log.warning('Scheduled backups disabled: %s', e)
+            return None
+    scheduler.start()
+    return scheduler
 
 # Routes
 
-@app.route('/elections/<int:election_id>/candidates', methods=['POST'])
+@api.route('/elections/<int:election_id>/candidates', methods=['POST'])
 @admin_required
 def add_candidate(election_id):
     data = request.json
@@ -56,32 +121,28 @@ def add_candidate(election_id):
         return jsonify({'message': 'Candidate name required'}), 400
     candidate = Candidate(name=name, election_id=election_id, photo_url=photo_url)
     db.session.add(candidate)
+    bump_revision(election_id)
     db.session.commit()
+    response_cache.invalidate('elections', 'summary', f'results:{election_id}')
+    tally_watcher.notify(election_id)
     return jsonify({'message': 'Candidate added', 'candidate': {'id': candidate.id, 'name': candidate.name, 'photo_url': candidate.photo_url}})
 
-@app.route('/candidates/<int:candidate_id>', methods=['DELETE'])
+@api.route('/candidates/<int:candidate_id>', methods=['DELETE'])
 @admin_required
 def delete_candidate(candidate_id):
     candidate = Candidate.query.get(candidate_id)
     if not candidate:
         return jsonify({'message': 'Candidate not found'}), 404
+    election_id = candidate.election_id
+    CandidateTally.query.filter_by(candidate_id=candidate_id).delete()
     db.session.delete(candidate)
+    bump_revision(election_id)
     db.session.commit()
+    response_cache.invalidate('elections', 'summary', f'results:{election_id}')
+    tally_watcher.notify(election_id)
     return jsonify({'message': 'Candidate deleted'})
 
-from functools import wraps
-
-def admin_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        username = request.json.get('username') if request.json else request.args.get('username')
-        user = User.query.filter_by(username=username).first()
-        if not user or user.role != 'admin':
-            return jsonify({'message': 'Unauthorized: Admins only'}), 403
-        return f(*args, **kwargs)
-    return decorated
-
-@app.route('/users', methods=['GET'])
+@api.route('/users', methods=['GET'])
 @admin_required
 def users():
     users = User.query.all()
@@ -90,7 +151,7 @@ def users():
         for u in users
     ])
 
-@app.route('/settings', methods=['GET', 'POST'])
+@api.route('/settings', methods=['GET', 'POST'])
 @admin_required
 def settings():
     if request.method == 'GET':
@@ -120,7 +181,7 @@ def settings():
         db.session.commit()
         return jsonify({'message': 'Settings updated successfully'})
 
-@app.route('/change_password', methods=['POST'])
+@api.route('/change_password', methods=['POST'])
 def change_password():
     data = request.json
     username = data.get('username')
@@ -128,180 +189,369 @@ def change_password():
     new_password = data.get('new_password')
     if not username or not current_password or not new_password:
         return jsonify({'message': 'Missing required fields'}), 400
-    user = User.query.filter_by(username=username).first()
-    if not user or not check_password_hash(user.password_hash, current_password):
+    user = find_credentials(username)
+    if not user or not password_hasher.verify(user.password_hash, current_password):
         return jsonify({'message': 'Invalid username or current password'}), 403
-    user.password_hash = generate_password_hash(new_password, method='pbkdf2:sha256')
-    db.session.commit()
+    replace_password_hash(user, password_hasher.hash(new_password))
     return jsonify({'message': 'Password updated successfully'})
-@app.route('/register', methods=['POST'])
+@api.route('/register', methods=['POST'])
+@rate_limiter.limit('register', ip='600/minute', username='10/minute')
 def register():
     try:
         data = request.json
-        print('Registration attempt:', data)
         if not data or 'username' not in data or 'password' not in data:
-            print('Missing username or password')
+            log.info('Registration rejected: missing username or password')
             return jsonify({'message': 'Missing username or password'}), 400
+        log.info('Registration attempt', extra={'username': data['username']})
         # Restrict registration to 'kantwi' or emails ending with '@dktawa.org'
         if not (data['username'] == 'kantwi' or data['username'].endswith('@dktawa.org')):
-            print('Registration restricted to dktawa.org emails or kantwi')
+            log.info('Registration rejected: domain not allowed', extra={'username': data['username']})
             return jsonify({'message': 'Registration restricted: Only kantwi or dktawa.org emails allowed'}), 400
         if User.query.filter_by(username=data['username']).first():
-            print('Username already exists:', data['username'])
+            log.info('Registration rejected: username exists', extra={'username': data['username']})
             return jsonify({'message': 'Username already exists'}), 400
         # Assign role: 'admin' for kantwi, 'user' for others
         role = 'admin' if data['username'] == 'kantwi' else 'user'
-        user = User(username=data['username'], password_hash=generate_password_hash(data['password'], method='pbkdf2:sha256'), role=role)
+        db.session.rollback()  # don't hold a connection while hashing
+        user = User(username=data['username'], password_hash=password_hasher.hash(data['password']), role=role)
         db.session.add(user)
         db.session.commit()
-        print('User registered:', data['username'], 'Role:', role)
+        response_cache.invalidate('summary')
+        log.info('User registered', extra={'username': data['username'], 'role': role})
         return jsonify({'message': 'Registered successfully'})
+    except HasherBusy:
+        raise
     except Exception as e:
-        print('Registration error:', str(e))
+        log.exception('Registration error')
         return jsonify({'message': 'Registration error: ' + str(e)}), 500
 
-@app.route('/login', methods=['POST'])
+def uploaded_records():
+    """Return (text stream, format) for a CSV/JSONL upload: a 'file' field or the raw request body."""
+    upload = request.files.get('file')
+    if upload:
+        stream, filename = upload.stream, upload.filename
+    else:
+        stream, filename = request.stream, None
+    default = 'jsonl' if request.mimetype in ('application/jsonl', 'application/x-ndjson') else 'csv'
+    return voter_import.text_stream(stream), request.args.get('format') or voter_import.detect_format(filename, default)
+
+@api.route('/admin/import_voters', methods=['POST'])
+@admin_required
+def import_voters_endpoint():
+    stream, fmt = uploaded_records()
+    try:
+        report = voter_import.import_voters(db, stream, password_hasher, fmt,
+                                            chunk_size=request.args.get('chunk_size', voter_import.DEFAULT_CHUNK_SIZE, type=int))
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'message': f'Import failed: {e}'}), 400
+    response_cache.invalidate('summary')
+    return jsonify(report.as_dict())
+
+@api.route('/login', methods=['POST'])
+@rate_limiter.limit('login', ip='600/minute', username='10/minute')
 def login():
     data = request.json
-    user = User.query.filter_by(username=data['username']).first()
-    if user and check_password_hash(user.password_hash, data['password']):
-        return jsonify({'message': 'Login successful', 'user_id': user.id, 'role': user.role})
+    user = find_credentials(data['username'])
+    valid, new_hash = password_hasher.verify_and_update(user.password_hash, data['password']) if user else (False, None)
+    if valid:
+        if new_hash:
+            replace_password_hash(user, new_hash)
+        return jsonify({'message': 'Login successful', 'user_id': user.id, 'role': user.role, 'token': token_auth.issue(user)})
     return jsonify({'message': 'Invalid credentials'}), 401
 
-@app.route('/elections', methods=['GET', 'POST'])
+@api.route('/logout', methods=['POST'])
+@token_auth.login_required
+def logout():
+    token_auth.revoke(g.auth)
+    return jsonify({'message': 'Logged out'})
+
+@api.route('/elections', methods=['GET', 'POST'])
 def elections():
     if request.method == 'POST':
         data = request.json
         # Only admin can create elections
-        username = data.get('username')
-        user = User.query.filter_by(username=username).first()
-        if not user or user.role != 'admin':
+        claims = token_auth.current_claims()
+        if not claims or claims['role'] != 'admin':
             return jsonify({'message': 'Unauthorized: Only admin can create elections'}), 403
         election = Election(title=data['title'])
-        db.session.add(election)
-        db.session.commit()
         for c in data['candidates']:
             # Accept either a string (name) or dict ({name, photo_url})
             if isinstance(c, dict):
-                candidate = Candidate(name=c.get('name'), election_id=election.id, photo_url=c.get('photo_url'))
+                candidate = Candidate(name=c.get('name'), photo_url=c.get('photo_url'))
             else:
-                candidate = Candidate(name=c, election_id=election.id)
-            db.session.add(candidate)
+                candidate = Candidate(name=c)
+            election.candidates.append(candidate)
+        db.session.add(election)
         db.session.commit()
+        response_cache.invalidate('elections', 'summary')
         return jsonify({'message': 'Election created'})
     else:
-        elections = Election.query.all()
-        result = []
-        for e in elections:
-            candidates = Candidate.query.filter_by(election_id=e.id).all()
-            result.append({'id': e.id, 'title': e.title, 'candidates': [{'id': c.id, 'name': c.name, 'photo_url': c.photo_url} for c in candidates]})
-        return jsonify(result)
-
-@app.route('/vote', methods=['POST'])
+        return response_cache.respond('elections', request.query_string.decode(), list_elections)
+
+def list_elections():
+    # Optional keyset pagination: ?since=<last seen election id>&limit=<page size>
+    query = Election.query.options(db.selectinload(Election.candidates)).order_by(Election.id)
+    since = request.args.get('since', type=int)
+    limit = request.args.get('limit', type=int)
+    if since is not None:
+        query = query.filter(Election.id > since)
+    if limit:
+        query = query.limit(limit + 1)
+    elections = query.all()
+    headers = {}
+    if limit and len(elections) > limit:
+        elections = elections[:limit]
+        headers['X-Next-Cursor'] = str(elections[-1].id)
+    return [
+        {'id': e.id, 'title': e.title, 'candidates': [{'id': c.id, 'name': c.name, 'photo_url': c.photo_url} for c in e.candidates]}
+        for e in elections
+    ], headers
+
+@api.route('/vote', methods=['POST'])
+# Polling stations put many voters behind one IP, so the IP limit is generous
+@rate_limiter.limit('vote', ip='600/minute', user_id='10/minute')
 def vote():
-    data = request.json
-    # Prevent duplicate votes
-    if Vote.query.filter_by(user_id=data['user_id'], election_id=data['election_id']).first():
+    data = request.get_json(silent=True) or {}
+    try:
+        user_id, election_id, candidate_id = (int(data[k]) for k in ('user_id', 'election_id', 'candidate_id'))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'message': 'user_id, election_id and candidate_id are required'}), 400
+    # Single INSERT ... SELECT: only inserts if the user exists and the candidate belongs to the
+    # election (SQLite does not enforce the foreign keys), and the unique_vote constraint is the
+    # duplicate check (no check-then-insert race)
+    ballot = (
+        db.select(User.id, db.literal(election_id), Candidate.id)
+        .select_from(Candidate)
+        .join(User, User.id == user_id)
+        .where(Candidate.id == candidate_id, Candidate.election_id == election_id)
+    )
+    try:
+        inserted = db.session.execute(
+            db.insert(Vote).from_select(['user_id', 'election_id', 'candidate_id'], ballot)).rowcount
+    except IntegrityError:
+        db.session.rollback()
         return jsonify({'message': 'User has already voted'}), 400
-    vote = Vote(user_id=data['user_id'], election_id=data['election_id'], candidate_id=data['candidate_id'])
-    db.session.add(vote)
+    if not inserted:
+        db.session.rollback()
+        if not db.session.query(User.id).filter_by(id=user_id).first():
+            return jsonify({'message': 'Unknown user'}), 400
+        return jsonify({'message': 'Candidate does not belong to this election'}), 400
+    record_votes(election_id, candidate_id)
+    # Queue the confirmation email in the same transaction; it is sent in the background
+    email_status = 'skipped'
+    smtp = Settings.query.first()
+    if smtp:
+        username = db.select(User.username).where(User.id == user_id).scalar_subquery()
+        details = db.session.execute(
+            db.select(username.label('username'), Candidate.name, Election.title)
+            .join(Election, Election.id == Candidate.election_id)
+            .where(Candidate.id == candidate_id)
+        ).first()
+        if details and '@' in details.username:
+            body = f"Dear {details.username},\n\nYour vote for '{details.name}' in the '{details.title}' election has been received.\n\nThank you for voting!"
+            mail_dispatcher.enqueue(details.username, f"Vote Confirmation: {details.title}", body)
+            email_status = 'queued'
     db.session.commit()
-    # Send email after vote
-    email_sent = False
-    email_error = None
-    try:
-        user = User.query.get(data['user_id'])
-        election = Election.query.get(data['election_id'])
-        candidate = Candidate.query.get(data['candidate_id'])
-        smtp = Settings.query.first()
-        if smtp and user and (user.username == 'kantwi' or '@' in user.username):
-            import smtplib
-            from email.mime.text import MIMEText
-            to_addr = user.username if '@' in user.username else None
-            if to_addr:
-                body = f"Dear {user.username},\n\nYour vote for '{candidate.name}' in the '{election.title}' election has been received.\n\nThank you for voting!"
-                msg = MIMEText(body)
-                msg['Subject'] = f"Vote Confirmation: {election.title}"
-                msg['From'] = smtp.smtp_from
-                msg['To'] = to_addr
-                server = smtplib.SMTP(smtp.smtp_host, smtp.smtp_port)
-                if smtp.smtp_tls:
-                    server.starttls()
-                server.login(smtp.smtp_user, smtp.smtp_password)
-                server.sendmail(smtp.smtp_from, [to_addr], msg.as_string())
-                server.quit()
-                email_sent = True
-    except Exception as e:
-        email_error = str(e)
-        print('Failed to send vote confirmation email:', email_error)
-    return jsonify({'message': 'Vote cast', 'email_sent': email_sent, 'email_error': email_error})
+    response_cache.invalidate('summary', f'results:{election_id}')
+    tally_watcher.notify(election_id)
+    if email_status == 'queued' and MAIL_DISPATCHER_MODE == 'thread':
+        mail_dispatcher.wake()
+    return jsonify({'message': 'Vote cast', 'email_status': email_status})
 
-@app.route('/admin/election_summary', methods=['GET'])
+@api.route('/admin/election_summary', methods=['GET'])
 @admin_required
 def election_summary():
-    users = User.query.filter(User.username != 'kantwi').all()
-    user_ids = set(u.id for u in users)
-    elections = Election.query.all()
+    return response_cache.respond('summary', '', summarize_elections)
+
+def summarize_elections():
+    # Constant number of queries regardless of how many elections or users exist
+    eligible = User.username != 'kantwi'
+    voters = db.session.query(db.func.count(User.id)).filter(eligible).scalar()
+    candidate_counts = dict(
+        db.session.query(Candidate.election_id, db.func.count(Candidate.id)).group_by(Candidate.election_id).all()
+    )
+    voted_counts = dict(
+        db.session.query(Vote.election_id, db.func.count(db.distinct(Vote.user_id)))
+        .join(User, User.id == Vote.user_id)
+        .filter(eligible)
+        .group_by(Vote.election_id)
+        .all()
+    )
     summary = []
-    for election in elections:
-        candidates = Candidate.query.filter_by(election_id=election.id).all()
-        votes = Vote.query.filter_by(election_id=election.id).all()
-        voted_user_ids = set(v.user_id for v in votes)
+    for election in Election.query.order_by(Election.id).all():
         summary.append({
             'title': election.title,
-            'candidates': len(candidates),
-            'voters': len(user_ids),
-            'voted': len(voted_user_ids & user_ids)  # only eligible users
+            'candidates': candidate_counts.get(election.id, 0),
+            'voters': voters,
+            'voted': voted_counts.get(election.id, 0)  # only eligible users
         })
-    return jsonify(summary)
+    return summary
 
-@app.route('/admin/vote_report/<int:election_id>', methods=['GET'])
+@api.route('/admin/ingest_ballots', methods=['POST'])
+@admin_required
+def ingest_ballots_endpoint():
+    stream, fmt = uploaded_records()
+    try:
+        report = ballot_ingest.ingest_ballots(db, stream, fmt, record_votes,
+                                              chunk_size=request.args.get('chunk_size', ballot_ingest.DEFAULT_CHUNK_SIZE, type=int))
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'message': f'Ingest failed: {e}'}), 400
+    response_cache.invalidate('summary', *(f'results:{e}' for e in report.elections))
+    for election_id in report.elections:
+        tally_watcher.notify(election_id)
+    return jsonify(report.as_dict())
+
+@api.route('/admin/elections/<int:election_id>/dashboard', methods=['GET'])
+@admin_required
+def election_dashboard(election_id):
+    election = Election.query.get(election_id)
+    if not election:
+        return jsonify({'message': 'Election not found'}), 404
+    # Depends on votes, candidates and registered users, all of which invalidate 'summary'
+    return response_cache.respond('summary', f'dashboard:{election_id}', lambda: dashboard_payload(election))
+
+def dashboard_payload(election):
+    """Everything one election view needs, from a handful of aggregate queries."""
+    eligible = User.username != 'kantwi'
+    version = election_versions([election.id]).get(election.id, 0)
+    candidates = [
+        {'id': c.id, 'name': c.name, 'photo_url': c.photo_url, 'votes': votes}
+        for c, votes in election_tally(election.id)
+    ]
+    voters = db.session.query(db.func.count(User.id)).filter(eligible).scalar()
+    voted = (
+        db.session.query(db.func.count(db.distinct(Vote.user_id)))
+        .join(User, User.id == Vote.user_id)
+        .filter(Vote.election_id == election.id, eligible)
+        .scalar()
+    )
+    return {
+        'id': election.id,
+        'title': election.title,
+        'version': version,
+        'candidates': candidates,
+        'voters': voters,
+        'voted': voted,
+        'turnout': round(voted / voters * 100, 1) if voters else 0,
+    }
+
+@api.route('/admin/vote_report/<int:election_id>', methods=['GET'])
 @admin_required
 def vote_report(election_id):
-    candidates = Candidate.query.filter_by(election_id=election_id).all()
-    votes = Vote.query.filter_by(election_id=election_id).all()
-    tally = {c.name: 0 for c in candidates}
-    for v in votes:
-        candidate = next((c for c in candidates if c.id == v.candidate_id), None)
-        if candidate:
-            tally[candidate.name] += 1
-    return jsonify(tally)
-
-@app.route('/results/<int:election_id>', methods=['GET'])
+    def build():
+        tally = {}
+        for c, votes in election_tally(election_id):
+            tally[c.name] = tally.get(c.name, 0) + votes
+        return tally
+    return response_cache.respond(f'results:{election_id}', 'vote_report', build)
+
+def export_digests_dir():
+    return os.environ.get('EXPORT_DIGEST_DIR') or os.path.join(current_app.instance_path, 'export-digests')
+
+@api.route('/admin/export/<kind>', methods=['GET'])
+@admin_required
+def export_endpoint(kind):
+    try:
+        export = audit_export.Export(db, kind, request.args.get('format', 'csv'),
+                                     election_id=request.args.get('election_id', type=int),
+                                     include_voters=request.args.get('include_voters') == '1')
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    export_id = uuid.uuid4().hex
+    digests_dir = export_digests_dir()
+
+    def generate():
+        yield from export
+        # Hash of exactly the bytes sent; GET .../sha256?id=<X-Export-Id> returns it
+        audit_export.record_digest(digests_dir, export_id, export)
+        log.info('Audit export sent', extra={'export': export.filename, 'export_id': export_id, 'rows': export.rows,
+                                             'bytes': export.size, 'sha256': export.sha256})
+    return Response(stream_with_context(generate()), mimetype=export.mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={export.filename}', 'X-Export-Id': export_id})
+
+@api.route('/admin/export/<kind>/sha256', methods=['GET'])
+@admin_required
+def export_digest(kind):
+    """Hash of a finished download, by the X-Export-Id it was sent with."""
+    digest = audit_export.load_digest(export_digests_dir(), request.args.get('id'))
+    if not digest or digest.pop('kind') != kind:
+        return jsonify({'message': 'Unknown export id, or the download has not finished'}), 404
+    return jsonify(digest)
+
+@api.route('/results/<int:election_id>', methods=['GET'])
 def results(election_id):
-    username = request.args.get('username')
-    user = User.query.filter_by(username=username).first()
-    if not user or user.username != 'kantwi' or user.role != 'admin':
+    if not can_view_results(token_auth.current_claims()):
         return jsonify({'message': 'Unauthorized'}), 403
-    candidates = Candidate.query.filter_by(election_id=election_id).all()
-    votes = Vote.query.filter_by(election_id=election_id).all()
-    tally = {c.id: 0 for c in candidates}
-    for v in votes:
-        tally[v.candidate_id] += 1
-    return jsonify({c.name: {'votes': tally[c.id], 'photo_url': c.photo_url} for c in candidates})
-
-@app.route('/user_count', methods=['GET'])
-def user_count():
-    username = request.args.get('username')
-    user = User.query.filter_by(username=username).first()
-    if not user or user.role != 'admin':
+    return response_cache.respond(f'results:{election_id}', 'results', lambda: results_payload(election_id))
+
+@api.route('/results/<int:election_id>/delta', methods=['GET'])
+def results_delta(election_id):
+    # Cheap polling: answered from the shared in-memory snapshot; tallies only when ?since= is stale
+    if not can_view_results(token_auth.current_claims()):
         return jsonify({'message': 'Unauthorized'}), 403
+    version, tallies = tally_watcher.snapshot(election_id)
+    changed = request.args.get('since', type=int) != version
+    return jsonify({'version': version, 'changed': changed, 'tallies': tallies if changed else None})
+
+@api.route('/results/<int:election_id>/stream', methods=['GET'])
+def results_stream(election_id):
+    # Server-Sent Events; EventSource cannot set headers, so ?token= is accepted here too
+    claims = token_auth.current_claims() or token_auth.verify(request.args.get('token', ''))
+    if not can_view_results(claims):
+        return jsonify({'message': 'Unauthorized'}), 403
+    return Response(tally_watcher.stream(election_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api.route('/user_count', methods=['GET'])
+@admin_required
+def user_count():
     count = User.query.count()
     return jsonify({'count': count})
 
-@app.route('/')
+@api.route('/')
 def index():
     return (
         '<h2>Online Voting API is running!</h2>'
         '<p>Try <a href="/elections">/elections</a> or <a href="/admin/election_summary">/admin/election_summary</a> for API data.</p>'
     )
 
+def create_app():
+    """Build the API app; command-line tools use ``models.create_db_app()`` instead."""
+    app = create_db_app()
+    mail_dispatcher.init_app(app, start=MAIL_DISPATCHER_MODE == 'thread')
+    CORS(app)
+    if os.environ.get('PROXY_FIX_HOPS'):
+        # Behind nginx: take the client IP (used by rate limits and logs) from X-Forwarded-For
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ['PROXY_FIX_HOPS']), x_proto=1)
+    init_request_logging(app, access_log=os.environ.get('LOG_ACCESS', '1') != '0')
+    with app.app_context():
+        request_metrics.init_app(app, db.engine, metrics_token=os.environ.get('METRICS_TOKEN'))
+    app.config['SECRET_KEY'] = load_secret_key(app.instance_path)
+    token_auth.init_app(app)
+    tally_watcher.init_app(app)
+    app.register_blueprint(api)
+    start_backup_scheduler(app)
+    return app
+
+_app = None
+
+def __getattr__(name):
+    # `gunicorn app:app`, `flask --app app` and `from app import app` build the API on first use;
+    # importing anything else from this module does not
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 if __name__ == '__main__':
     import argparse
+    from flask_migrate import upgrade
     parser = argparse.ArgumentParser()
     parser.add_argument('--host', default='0.0.0.0')
     parser.add_argument('--port', type=int, default=8080)
     args = parser.parse_args()
-    with app.app_context():
-        db.create_all()
-    app.run(debug=False, host=args.host, port=args.port)
+    with create_db_app(migrations=True).app_context():
+        upgrade()
+    create_app().run(debug=False, host=args.host, port=args.port)
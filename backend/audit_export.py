@@ -0,0 +1,257 @@
+"""Streaming audit export of ballots and tallies (CSV, JSONL or Parquet).
+
+``ballots`` has one row per vote, including votes whose candidate or
+election has since been deleted (their names are left empty); ``tallies`` has one row per candidate, with
+the count recomputed from the vote table next to the stored tally counter so
+any drift is visible. Rows are read with ``yield_per`` (a server-side cursor
+where the database supports one) and encoded batch by batch, so memory stays
+flat however many ballots there are. Rows are ordered by primary key, so an
+export of a closed election is byte-for-byte reproducible, and every export
+reports the SHA-256 of its content for auditors to check. The API records the
+hash of each download it finished sending (``record_digest``), so it can be
+looked up afterwards even while votes keep changing the data.
+
+Voter ids are left out unless ``include_voters`` is set, to keep ballots
+secret by default.
+
+    python3 audit_export.py ballots --format csv --output ballots.csv --election 3
+    ./admin_tasks.sh export tallies --format parquet --output tallies.parquet
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import time
+
+KINDS = ('ballots', 'tallies')
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+DEFAULT_BATCH_SIZE = 5000
+DIGEST_MAX_AGE = 7 * 24 * 3600
+EXPORT_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _ballots_query(db, election_id, include_voters):
+    tables = db.metadata.tables
+    vote, election, candidate = tables['vote'], tables['election'], tables['candidate']
+    columns = [vote.c.id.label('vote_id'), vote.c.election_id, election.c.title.label('election_title'),
+               vote.c.candidate_id, candidate.c.name.label('candidate_name')]
+    if include_voters:
+        columns.append(vote.c.user_id)
+    stmt = (db.select(*columns)
+            .outerjoin(election, election.c.id == vote.c.election_id)
+            .outerjoin(candidate, candidate.c.id == vote.c.candidate_id)
+            .order_by(vote.c.id))
+    if election_id is not None:
+        stmt = stmt.where(vote.c.election_id == election_id)
+    return stmt
+
+
+def _tallies_query(db, election_id):
+    tables = db.metadata.tables
+    vote, election, candidate, tally = (tables['vote'], tables['election'], tables['candidate'],
+                                        tables['candidate_tally'])
+    counted = (db.select(vote.c.candidate_id, db.func.count().label('votes'))
+               .group_by(vote.c.candidate_id).subquery())
+    stmt = (db.select(candidate.c.election_id, election.c.title.label('election_title'),
+                      candidate.c.id.label('candidate_id'), candidate.c.name.label('candidate_name'),
+                      db.func.coalesce(counted.c.votes, 0).label('votes'),
+                      db.func.coalesce(tally.c.votes, 0).label('counter_votes'))
+            .join(election, election.c.id == candidate.c.election_id)
+            .outerjoin(counted, counted.c.candidate_id == candidate.c.id)
+            .outerjoin(tally, tally.c.candidate_id == candidate.c.id)
+            .order_by(candidate.c.election_id, candidate.c.id))
+    if election_id is not None:
+        stmt = stmt.where(candidate.c.election_id == election_id)
+    return stmt
+
+
+def iter_batches(db, kind, election_id=None, include_voters=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield (column names, list of row tuples) batches; must run inside an app context."""
+    if kind == 'ballots':
+        stmt = _ballots_query(db, election_id, include_voters)
+    elif kind == 'tallies':
+        stmt = _tallies_query(db, election_id)
+    else:
+        raise ValueError(f'Unknown export: {kind}')
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    columns = list(result.keys())
+    for partition in result.partitions():
+        yield columns, [tuple(row) for row in partition]
+
+
+def _encode_text(batches, fmt):
+    header_written = False
+    for columns, rows in batches:
+        buffer = io.StringIO()
+        if fmt == 'csv':
+            writer = csv.writer(buffer, lineterminator='\n')
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                buffer.write(json.dumps(dict(zip(columns, row))) + '\n')
+        yield buffer.getvalue().encode('utf-8'), len(rows)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what pyarrow wrote since the last drain."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def _encode_parquet(batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = _ChunkSink()
+    writer = None
+    for columns, rows in batches:
+        table = pa.Table.from_pydict({name: [row[i] for row in rows] for i, name in enumerate(columns)},
+                                     schema=_parquet_schema(pa, columns))
+        if writer is None:
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), table.schema)
+        writer.write_table(table)
+        yield sink.drain(), len(rows)
+    writer.close()
+    yield sink.drain(), 0
+
+
+def _parquet_schema(pa, columns):
+    return pa.schema([(name, pa.string() if name.endswith(('_title', '_name')) else pa.int64()) for name in columns])
+
+
+def _columns(kind, include_voters):
+    if kind == 'ballots':
+        return ['vote_id', 'election_id', 'election_title', 'candidate_id', 'candidate_name'] + (
+            ['user_id'] if include_voters else [])
+    return ['election_id', 'election_title', 'candidate_id', 'candidate_name', 'votes', 'counter_votes']
+
+
+class Export:
+    """Iterate to get the encoded bytes; ``sha256``, ``rows`` and ``size`` are final once exhausted."""
+
+    def __init__(self, db, kind, fmt='csv', election_id=None, include_voters=False, batch_size=DEFAULT_BATCH_SIZE):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown export {kind!r}; choose from {', '.join(KINDS)}")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}; choose from {', '.join(FORMATS)}")
+        if fmt == 'parquet':
+            import importlib.util
+            if importlib.util.find_spec('pyarrow') is None:
+                raise ValueError('Parquet export requires pyarrow (pip3 install pyarrow)')
+        self.db = db
+        self.kind = kind
+        self.fmt = fmt
+        self.election_id = election_id
+        self.include_voters = include_voters
+        self.batch_size = batch_size
+        self.digest = hashlib.sha256()
+        self.rows = 0
+        self.size = 0
+
+    @property
+    def sha256(self):
+        return self.digest.hexdigest()
+
+    @property
+    def filename(self):
+        scope = f'-election-{self.election_id}' if self.election_id is not None else ''
+        return f'{self.kind}{scope}.{self.fmt}'
+
+    @property
+    def mimetype(self):
+        return FORMATS[self.fmt]
+
+    def __iter__(self):
+        batches = iter_batches(self.db, self.kind, self.election_id, self.include_voters, self.batch_size)
+        if self.fmt != 'jsonl':
+            # CSV header / Parquet schema even when there are no rows
+            batches = _nonempty(batches, _columns(self.kind, self.include_voters))
+        chunks = _encode_parquet(batches) if self.fmt == 'parquet' else _encode_text(batches, self.fmt)
+        for data, rows in chunks:
+            self.rows += rows
+            if data:
+                self.digest.update(data)
+                self.size += len(data)
+                yield data
+
+
+def record_digest(directory, export_id, export):
+    """Save a finished export's hash as ``<export_id>.json`` (a directory shared by the workers on a host)."""
+    os.makedirs(directory, exist_ok=True)
+    cutoff = time.time() - DIGEST_MAX_AGE
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+    path = os.path.join(directory, export_id + '.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'kind': export.kind, 'file': export.filename, 'rows': export.rows, 'bytes': export.size,
+                   'sha256': export.sha256}, f)
+    os.replace(path + '.tmp', path)
+
+
+def load_digest(directory, export_id):
+    """Return what ``record_digest`` saved for ``export_id``, or None if unknown or not finished."""
+    if not EXPORT_ID.match(export_id or ''):
+        return None
+    try:
+        with open(os.path.join(directory, export_id + '.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _nonempty(batches, columns):
+    empty = True
+    for batch in batches:
+        empty = False
+        yield batch
+    if empty:
+        yield columns, []
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Export ballots or tallies for an audit.')
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('--format', choices=list(FORMATS), default='csv')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--election', type=int)
+    parser.add_argument('--include-voters', action='store_true', help='add user_id to each ballot')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    from models import create_db_app, db
+    with create_db_app().app_context():
+        export = Export(db, args.kind, args.format, args.election, args.include_voters, args.batch_size)
+        with open(args.output, 'wb') as f:
+            for chunk in export:
+                f.write(chunk)
+    with open(args.output + '.sha256', 'w') as f:
+        f.write(f'{export.sha256}  {os.path.basename(args.output)}\n')
+    print(f'Exported {export.rows} rows ({export.size} bytes) to {args.output}')
+    print(f'SHA-256 {export.sha256} (also in {args.output}.sha256; check with `sha256sum -c`)')
@@ -0,0 +1,105 @@
+"""Stateless session tokens issued by /login.
+
+Tokens are signed with the app's ``SECRET_KEY`` and carry the user id,
+username and role, so checking them needs no database query. Revoked tokens
+(``/logout``) are remembered in memory until they would have expired anyway;
+the set is per process.
+"""
+import os
+import secrets
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+
+def load_secret_key(instance_path):
+    """Use SECRET_KEY from the environment, or a key persisted in the instance folder.
+
+    The file keeps tokens valid across restarts and across gunicorn workers
+    on the same host.
+    """
+    key = os.environ.get('SECRET_KEY')
+    if key:
+        return key
+    path = os.path.join(instance_path, 'secret_key')
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    os.makedirs(instance_path, exist_ok=True)
+    key = secrets.token_hex(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another worker created it first
+        with open(path) as f:
+            return f.read().strip()
+    with os.fdopen(fd, 'w') as f:
+        f.write(key)
+    return key
+
+
+class TokenAuth:
+    def __init__(self, secret_key=None, max_age=12 * 3600):
+        """Without ``secret_key``, ``init_app`` sets it from the app's ``SECRET_KEY``."""
+        self.serializer = URLSafeTimedSerializer(secret_key, salt='auth-token') if secret_key else None
+        self.max_age = max_age
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='auth-token')
+
+    def issue(self, user):
+        return self.serializer.dumps({
+            'uid': user.id, 'username': user.username, 'role': user.role, 'jti': secrets.token_hex(8),
+        })
+
+    def verify(self, token):
+        """Return the token claims, or None if it is invalid, expired or revoked."""
+        try:
+            claims, issued_at = self.serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+        except (BadSignature, SignatureExpired):
+            return None
+        if claims.get('jti') in self._revoked:
+            return None
+        claims['iat'] = issued_at.timestamp()
+        return claims
+
+    def revoke(self, claims):
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._revoked[claims['jti']] = claims['iat'] + self.max_age
+
+    def current_claims(self):
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return None
+        return self.verify(header[len('Bearer '):].strip())
+
+    def login_required(self, f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            claims = self.current_claims()
+            if not claims:
+                return jsonify({'message': 'Authentication required'}), 401
+            g.auth = claims
+            return f(*args, **kwargs)
+        return decorated
+
+    def admin_required(self, f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            claims = self.current_claims()
+            if not claims:
+                return jsonify({'message': 'Authentication required'}), 401
+            if claims['role'] != 'admin':
+                return jsonify({'message': 'Unauthorized: Admins only'}), 403
+            g.auth = claims
+            return f(*args, **kwargs)
+        return decorated
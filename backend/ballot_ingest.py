@@ -0,0 +1,151 @@
+"""Bulk ingestion of ballots collected offline (paper or kiosk votes).
+
+Each record needs ``user_id``, ``election_id`` and ``candidate_id`` (CSV with
+a header row, or JSON Lines). Elections and candidates are validated against
+lookup tables loaded once; voters are checked with one ``IN`` query per chunk.
+Valid ballots are written with ``INSERT ... ON CONFLICT DO NOTHING RETURNING``
+so the ``unique_vote`` constraint decides which ones are duplicates, and each
+chunk (votes plus tally counters) is committed as one transaction.
+
+    python3 ballot_ingest.py ballots.csv --report results.jsonl
+    ./admin_tasks.sh ingest-ballots ballots.jsonl
+"""
+from collections import Counter
+from itertools import islice
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from voter_import import detect_format, read_records
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class IngestReport:
+    def __init__(self, max_rejections=1000, on_result=None):
+        self.accepted = 0
+        self.rejected = 0
+        self.rejections = []
+        self.elections = set()
+        self.max_rejections = max_rejections
+        self.on_result = on_result
+
+    def accept(self, line, ballot):
+        self.accepted += 1
+        self.elections.add(ballot['election_id'])
+        if self.on_result:
+            self.on_result({'line': line, 'status': 'accepted', **ballot})
+
+    def reject(self, line, ballot, reason):
+        self.rejected += 1
+        result = {'line': line, 'status': 'rejected', 'reason': reason, **(ballot or {})}
+        if len(self.rejections) < self.max_rejections:
+            self.rejections.append(result)
+        if self.on_result:
+            self.on_result(result)
+
+    def as_dict(self):
+        return {
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'rejections': self.rejections,
+            'rejections_truncated': self.rejected > len(self.rejections),
+        }
+
+
+def _parse(record):
+    try:
+        return {key: int(record[key]) for key in ('user_id', 'election_id', 'candidate_id')}, None
+    except KeyError as e:
+        return None, f'Missing {e.args[0]}'
+    except (TypeError, ValueError):
+        return None, 'user_id, election_id and candidate_id must be integers'
+
+
+def _ingest_chunk(db, votes, users, candidate_elections, record_votes, chunk, report):
+    pending = {}
+    for line, record, error in chunk:
+        if error:
+            report.reject(line, None, error)
+            continue
+        ballot, error = _parse(record)
+        if error:
+            report.reject(line, None, error)
+        elif candidate_elections.get(ballot['candidate_id']) != ballot['election_id']:
+            report.reject(line, ballot, 'Candidate does not belong to this election')
+        elif (ballot['user_id'], ballot['election_id']) in pending:
+            report.reject(line, ballot, 'User has already voted')
+        else:
+            pending[(ballot['user_id'], ballot['election_id'])] = (line, ballot)
+    if not pending:
+        return
+    user_ids = {user_id for user_id, _ in pending}
+    known = {row[0] for row in db.session.execute(db.select(users.c.id).where(users.c.id.in_(user_ids)))}
+    for key in [key for key in pending if key[0] not in known]:
+        line, ballot = pending.pop(key)
+        report.reject(line, ballot, 'Unknown user')
+    if not pending:
+        return
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    stmt = (dialect.insert(votes)
+            .on_conflict_do_nothing(index_elements=['user_id', 'election_id'])
+            .returning(votes.c.user_id, votes.c.election_id))
+    inserted = {tuple(row) for row in db.session.execute(stmt, [ballot for _, ballot in pending.values()])}
+    counts = Counter()
+    for key, (line, ballot) in pending.items():
+        if key in inserted:
+            counts[(ballot['election_id'], ballot['candidate_id'])] += 1
+            report.accept(line, ballot)
+        else:
+            report.reject(line, ballot, 'User has already voted')
+    for (election_id, candidate_id), count in counts.items():
+        record_votes(election_id, candidate_id, count)
+    db.session.commit()
+
+
+def ingest_ballots(db, stream, fmt, record_votes, chunk_size=DEFAULT_CHUNK_SIZE, on_result=None):
+    """Ingest ballots from a text stream; must run inside an app context.
+
+    ``record_votes(election_id, candidate_id, count)`` updates the tally
+    counters in the chunk's transaction.
+    """
+    votes = db.metadata.tables['vote']
+    users = db.metadata.tables['user']
+    candidates = db.metadata.tables['candidate']
+    candidate_elections = dict(db.session.execute(db.select(candidates.c.id, candidates.c.election_id)).all())
+    report = IngestReport(on_result=on_result)
+    records = read_records(stream, fmt)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        _ingest_chunk(db, votes, users, candidate_elections, record_votes, chunk, report)
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description='Ingest offline ballots from a CSV or JSONL file.')
+    parser.add_argument('file')
+    parser.add_argument('--format', choices=['csv', 'jsonl'])
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--report', help='write one JSON line per ballot (accepted or rejected) to this file')
+    args = parser.parse_args()
+    from models import create_db_app, db, record_votes
+    from response_cache import ResponseCache
+    report_file = open(args.report, 'w') if args.report else None
+
+    def on_result(result):
+        if report_file:
+            report_file.write(json.dumps(result) + '\n')
+        elif result['status'] == 'rejected':
+            print(f"line {result['line']}: rejected: {result['reason']}")
+
+    with create_db_app().app_context(), open(args.file, encoding='utf-8-sig', newline='') as f:
+        report = ingest_ballots(db, f, args.format or detect_format(args.file), record_votes, args.chunk_size, on_result)
+    if report_file:
+        report_file.close()
+    cache = ResponseCache.from_env()
+    if cache.shared:  # a private in-memory cache here would not reach the API workers
+        cache.invalidate('summary', *(f'results:{e}' for e in report.elections))
+    print(f'Accepted {report.accepted} ballots, rejected {report.rejected}.')
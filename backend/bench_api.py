@@ -0,0 +1,278 @@
+"""Load test for the voting API.
+
+Seeds a throw-away database with synthetic users, elections and candidates
+(bulk INSERTs, not the HTTP API), then drives the hot endpoints from
+concurrent workers and reports throughput and latency percentiles per
+scenario. Results are written as JSON so runs of different versions can be
+compared:
+
+    python3 bench_api.py --users 5000 --elections 5 --candidates 4 --output bench/v2.json
+    python3 bench_api.py --target gunicorn --workers 4 --compare bench/v2.json
+
+Targets: ``testclient`` (in-process Flask test client, default), ``gunicorn``
+(starts ``gunicorn app:app`` on a local port) or ``--url`` (an already running
+server; it must use the seeded database, so pass the printed DATABASE_URL).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCH_PASSWORD = 'bench-password'
+SCENARIOS = ['login', 'elections', 'vote', 'results', 'election_summary']
+
+
+def seed(db, users, elections, candidates, password_hash):
+    """Bulk-insert synthetic data; returns {election_id: [candidate ids]}."""
+    tables = db.metadata.tables
+    db.session.execute(tables['user'].insert(), [{'username': 'kantwi', 'password_hash': password_hash, 'role': 'admin'}])
+    for start in range(0, users, 5000):
+        db.session.execute(tables['user'].insert(), [
+            {'username': f'voter{i}@dktawa.org', 'password_hash': password_hash, 'role': 'user'}
+            for i in range(start, min(start + 5000, users))
+        ])
+    db.session.execute(tables['election'].insert(), [{'title': f'Election {e}'} for e in range(elections)])
+    election_ids = [row[0] for row in db.session.execute(db.select(tables['election'].c.id))]
+    db.session.execute(tables['candidate'].insert(), [
+        {'name': f'Candidate {e}-{c}', 'election_id': election_id}
+        for e, election_id in enumerate(election_ids) for c in range(candidates)
+    ])
+    db.session.commit()
+    ballot = {}
+    for candidate_id, election_id in db.session.execute(db.select(tables['candidate'].c.id, tables['candidate'].c.election_id)):
+        ballot.setdefault(election_id, []).append(candidate_id)
+    return ballot
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, json_body=None, headers=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, json=json_body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTPTransport:
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.requests = requests
+        self.local = threading.local()
+
+    def request(self, method, path, json_body=None, headers=None):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = self.requests.Session()
+        response = session.request(method, self.base_url + path, json=json_body, headers=headers, timeout=60)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(name, transport, requests_count, concurrency, context):
+    admin = {'Authorization': f"Bearer {context['token']}"}
+    ballots = itertools.cycle(context['ballots'])
+    counter_lock = threading.Lock()
+    election_ids = list(context['election_candidates'])
+
+    def one(i):
+        if name == 'login':
+            call = ('POST', '/login', {'username': f'voter{i % context["users"]}@dktawa.org', 'password': BENCH_PASSWORD}, None)
+        elif name == 'elections':
+            call = ('GET', '/elections', None, None)
+        elif name == 'vote':
+            with counter_lock:
+                user_id, election_id, candidate_id = next(ballots)
+            call = ('POST', '/vote', {'user_id': user_id, 'election_id': election_id, 'candidate_id': candidate_id}, None)
+        elif name == 'results':
+            call = ('GET', f'/results/{election_ids[i % len(election_ids)]}', None, admin)
+        else:
+            call = ('GET', '/admin/election_summary', None, admin)
+        started = time.perf_counter()
+        try:
+            status, _ = transport.request(*call)
+        except Exception:
+            status = 'error'
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests_count)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for status, latency in outcomes if status == 200)
+    errors = {}
+    for status, _ in outcomes:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'requests': requests_count,
+        'ok': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(workers, env):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-k', 'gthread', '--threads', '8',
+         '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError('gunicorn exited during startup (is it installed?)')
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 30 seconds')
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('revision')}):")
+    for name, current in report['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before or not before.get('throughput_rps') or not current.get('throughput_rps'):
+            continue
+        change = (current['throughput_rps'] - before['throughput_rps']) / before['throughput_rps'] * 100
+        print(f"  {name:<17} {before['throughput_rps']:>8} -> {current['throughput_rps']:>8} req/s ({change:+.1f}%), "
+              f"p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--elections', type=int, default=3)
+    parser.add_argument('--candidates', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--target', choices=['testclient', 'gunicorn'], default='testclient')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--url', help='benchmark an already running server instead')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args()
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    workdir = tempfile.mkdtemp(prefix='vote-bench-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['MAIL_DISPATCHER'] = 'off'
+    os.environ.setdefault('LOG_ACCESS', '0')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    from app import app, db
+    from password_hashing import hash_password
+
+    with app.app_context():
+        db.create_all()
+        election_candidates = seed(db, args.users, args.elections, args.candidates,
+                                   hash_password(BENCH_PASSWORD))
+    print(f"Seeded {args.users} users, {args.elections} elections x {args.candidates} candidates "
+          f"(DATABASE_URL={os.environ['DATABASE_URL']})")
+
+    server = None
+    if args.url:
+        transport = HTTPTransport(args.url)
+    elif args.target == 'gunicorn':
+        server, url = start_gunicorn(args.workers, dict(os.environ))
+        transport = HTTPTransport(url)
+    else:
+        transport = TestClientTransport(app)
+
+    try:
+        status, body = transport.request('POST', '/login', {'username': 'kantwi', 'password': BENCH_PASSWORD})
+        if status != 200:
+            raise SystemExit(f'Admin login failed ({status})')
+        # Voter i (user id i + 2, after kantwi) votes once in each election
+        ballots = [
+            (user_id, election_id, candidates[user_id % len(candidates)])
+            for election_id, candidates in election_candidates.items()
+            for user_id in range(2, args.users + 2)
+        ]
+        context = {'token': body['token'], 'users': args.users, 'ballots': ballots,
+                   'election_candidates': election_candidates}
+        report = {
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'target': args.url or args.target,
+                'workers': args.workers if args.target == 'gunicorn' and not args.url else None,
+                'users': args.users, 'elections': args.elections, 'candidates': args.candidates,
+                'requests': args.requests, 'concurrency': args.concurrency,
+            },
+            'scenarios': {},
+        }
+        for name in scenarios:
+            result = run_scenario(name, transport, args.requests, args.concurrency, context)
+            report['scenarios'][name] = result
+            print(f"{name:<17} {result['throughput_rps']:>8} req/s  p50 {result['p50_ms']} ms  "
+                  f"p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  errors {result['errors'] or 'none'}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Report written to {args.output}')
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
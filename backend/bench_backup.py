@@ -0,0 +1,121 @@
+"""Vote latency while an online backup runs.
+
+Seeds a throw-away database with ``--elections`` x ``--voters`` ballots
+(default 1M, bulk-inserted with sqlite3), then casts votes into a spare
+election from ``--threads`` clients: first for ``--baseline`` seconds with
+nothing else running, then while ``db_backup.py backup`` runs in a separate
+process. Reports /vote latency for both phases plus the backup's duration and
+size.
+
+    python3 bench_backup.py --elections 100 --voters 10000 --threads 4
+"""
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('MAIL_DISPATCHER', 'off')
+os.environ.setdefault('LOG_ACCESS', '0')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+os.environ.setdefault('SECRET_KEY', 'bench-secret')
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else float('nan')
+
+
+def seed(path, elections, voters, candidates):
+    """Fill every election but the last with one ballot per voter; returns the spare election's candidates."""
+    conn = sqlite3.connect(path)
+    conn.executemany('INSERT INTO user (id, username, password_hash, role) VALUES (?, ?, ?, ?)',
+                     ((i, f'voter{i}@dktawa.org', 'x', 'user') for i in range(1, voters + 1)))
+    conn.executemany('INSERT INTO election (id, title) VALUES (?, ?)',
+                     ((e, f'Election {e}') for e in range(1, elections + 2)))
+    conn.executemany('INSERT INTO candidate (id, name, election_id) VALUES (?, ?, ?)',
+                     (((e - 1) * candidates + c + 1, f'Candidate {e}-{c}', e)
+                      for e in range(1, elections + 2) for c in range(candidates)))
+    for e in range(1, elections + 1):
+        conn.executemany('INSERT INTO vote (user_id, election_id, candidate_id) VALUES (?, ?, ?)',
+                         ((u, e, (e - 1) * candidates + u % candidates + 1) for u in range(1, voters + 1)))
+    conn.commit()
+    conn.close()
+    return [elections * candidates + c + 1 for c in range(candidates)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--elections', type=int, default=100)
+    parser.add_argument('--voters', type=int, default=10000)
+    parser.add_argument('--candidates', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--baseline', type=float, default=5, help='seconds of voting before the backup')
+    opts = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='backup-bench-')
+    path = os.path.join(workdir, 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+    started = time.perf_counter()
+    spare = seed(path, opts.elections, opts.voters, opts.candidates)
+    print(f'Seeded {opts.elections * opts.voters} ballots in {time.perf_counter() - started:.1f} s '
+          f'({os.path.getsize(path) / 1e6:.0f} MB)')
+
+    next_voter = iter(range(1, opts.voters + 1))
+    voter_lock = threading.Lock()
+    local = threading.local()
+
+    def cast(stop_at):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        latencies = []
+        while time.perf_counter() < stop_at():
+            with voter_lock:
+                user_id = next(next_voter, None)
+            if user_id is None:
+                break
+            began = time.perf_counter()
+            response = local.client.post('/vote', json={'user_id': user_id, 'election_id': opts.elections + 1,
+                                                        'candidate_id': spare[user_id % len(spare)]})
+            if response.status_code != 200:
+                raise RuntimeError(f'/vote returned {response.status_code}: {response.get_json()}')
+            latencies.append(time.perf_counter() - began)
+        return latencies
+
+    def run(stop_at):
+        with ThreadPoolExecutor(opts.threads) as pool:
+            return [t for batch in pool.map(lambda _: cast(stop_at), range(opts.threads)) for t in batch]
+
+    deadline = time.perf_counter() + opts.baseline
+    baseline = run(lambda: deadline)
+
+    backup_dir = os.path.join(workdir, 'backups')
+    began = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'db_backup.py', 'backup', '--dir', backup_dir],
+                               cwd=os.path.dirname(os.path.abspath(__file__)), env=os.environ,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    finished = []
+    threading.Thread(target=lambda: (process.wait(), finished.append(time.perf_counter()))).start()
+    during = run(lambda: finished[0] if finished else float('inf'))
+    if process.returncode:
+        sys.exit(f'Backup failed: {process.stdout.read()}')
+    backups = [f for f in os.listdir(backup_dir) if f.endswith('.db.gz')]
+    size = os.path.getsize(os.path.join(backup_dir, backups[0]))
+
+    print(f'Backup took {finished[0] - began:.1f} s, {size / 1e6:.1f} MB compressed')
+    for label, latencies in (('baseline', baseline), ('during backup', during)):
+        print(f'{label:<14} {len(latencies):6d} votes  p50 {percentile(latencies, 50):6.1f} ms  '
+              f'p95 {percentile(latencies, 95):6.1f} ms  p99 {percentile(latencies, 99):6.1f} ms  '
+              f'max {max(latencies) * 1000 if latencies else float("nan"):6.1f} ms')
+    print(f'Data left in {workdir}')
+
+
+if __name__ == '__main__':
+    main()
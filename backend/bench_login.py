@@ -0,0 +1,147 @@
+"""Login throughput under concurrent load.
+
+Default comparison: password hashing on the request thread vs. in the hashing
+pool. Each mode seeds a fresh database, then ``--threads`` clients log in
+concurrently while a probe thread keeps requesting ``/elections`` (uncached),
+to show whether cheap requests are still served during a login burst.
+
+With ``--abusers N``, N extra threads run a credential-stuffing loop (wrong
+passwords for real accounts, from one IP) during the burst, and the comparison is rate limiting
+off vs. on, to show what the abuse does to legitimate voters' logins.
+
+    python3 bench_login.py --users 200 --logins 200 --threads 16 --pool-workers 4
+    python3 bench_login.py --abusers 16
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD = 'bench-password'
+ABUSER_IP = '203.0.113.7'
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else float('nan')
+
+
+def run_mode(pool_workers, rate_limits, opts, results):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='login-bench-'), 'bench.db')
+    os.environ['PASSWORD_HASH_WORKERS'] = str(pool_workers)
+    os.environ['PASSWORD_HASH_MAX_PENDING'] = str(max(opts.threads + opts.abusers, 1))
+    os.environ['RATE_LIMIT_ENABLED'] = '1' if rate_limits else '0'
+    os.environ['RESPONSE_CACHE_TTL'] = '0'
+    os.environ['MAIL_DISPATCHER'] = 'off'
+    os.environ['LOG_ACCESS'] = '0'
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    if opts.method:
+        os.environ['PASSWORD_HASH_METHOD'] = opts.method
+    from app import app, db, password_hasher
+    from password_hashing import hash_password
+
+    with app.app_context():
+        db.create_all()
+        password_hash = hash_password(PASSWORD)
+        db.session.execute(db.metadata.tables['user'].insert(), [
+            {'username': f'voter{i}@dktawa.org', 'password_hash': password_hash, 'role': 'user'}
+            for i in range(opts.users)
+        ])
+        db.session.commit()
+    if pool_workers:
+        password_hasher.verify(password_hash, PASSWORD)  # start the pool outside the timed run
+    local = threading.local()
+
+    def login(i):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        user = i % opts.users
+        started = time.perf_counter()
+        response = local.client.post('/login', json={'username': f'voter{user}@dktawa.org', 'password': PASSWORD},
+                                     environ_base={'REMOTE_ADDR': f'10.1.{user // 250}.{user % 250 + 1}'})
+        return response.status_code, time.perf_counter() - started
+
+    probe_latencies = []
+    abuse_statuses = []
+    done = threading.Event()
+
+    def probe():
+        client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get('/elections')
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    def abuse(n):
+        client = app.test_client()
+        i = 0
+        while not done.is_set():
+            i += 1
+            victim = (n * 7919 + i) % opts.users
+            response = client.post('/login', json={'username': f'voter{victim}@dktawa.org', 'password': f'guess{i}'},
+                                   environ_base={'REMOTE_ADDR': ABUSER_IP})
+            abuse_statuses.append(response.status_code)
+
+    background = [threading.Thread(target=probe)] + [threading.Thread(target=abuse, args=(n,)) for n in range(opts.abusers)]
+    for thread in background:
+        thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(opts.threads) as pool:
+        outcomes = list(pool.map(login, range(opts.logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in background:
+        thread.join()
+    password_hasher.shutdown()
+    latencies = [latency for status, latency in outcomes if status == 200]
+    results.put({
+        'ok': len(latencies),
+        'failed': len(outcomes) - len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'probe_p50': percentile(probe_latencies, 50),
+        'probe_p95': percentile(probe_latencies, 95),
+        'abuse_requests': len(abuse_statuses),
+        'abuse_limited': abuse_statuses.count(429),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--pool-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--abusers', type=int, default=0, help='credential-stuffing threads (compares rate limits off/on)')
+    parser.add_argument('--method', help='PASSWORD_HASH_METHOD to benchmark (default: configured method)')
+    opts = parser.parse_args()
+
+    if opts.abusers:
+        modes = [('no rate limits', opts.pool_workers, False), ('rate limits', opts.pool_workers, True)]
+    else:
+        modes = [('inline', 0, False), (f'pool ({opts.pool_workers} workers)', opts.pool_workers, False)]
+    # Each mode runs in a fresh (non-daemonic, so it can start the hashing pool)
+    # interpreter so the app is configured from scratch
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    print(f'{opts.logins} logins from {opts.threads} threads on {os.cpu_count()} CPUs'
+          + (f', {opts.abusers} abusive threads' if opts.abusers else ''))
+    for label, workers, rate_limits in modes:
+        process = ctx.Process(target=run_mode, args=(workers, rate_limits, opts, results))
+        process.start()
+        r = results.get()
+        process.join()
+        line = (f"{label:<20} {r['throughput']:7.1f} logins/s  p50 {r['p50']:7.0f} ms  p95 {r['p95']:7.0f} ms  "
+                f"failed {r['failed']}  |  /elections during burst p50 {r['probe_p50']:6.1f} ms  p95 {r['probe_p95']:6.1f} ms")
+        if opts.abusers:
+            line += f"  |  abusive requests {r['abuse_requests']} ({r['abuse_limited']} got 429)"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Cold-start time and memory of the API, the CLI tools and the dashboard.
+
+Each case runs in a fresh interpreter (``--repeat`` times, median reported)
+and prints the time to import and build its app plus the process's peak RSS:
+
+- ``api``: what a gunicorn worker does, ``import app`` then ``app.app``
+- ``cli``: what the admin scripts do, ``models.create_db_app()``
+- ``dashboard``: importing ``vote_report_dash``
+
+``--gunicorn N`` also starts ``gunicorn -w N app:app`` on a free port and
+reports the time until it answers and the RSS of the master and each worker.
+
+    python3 bench_startup.py --repeat 5 --gunicorn 4
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CASES = {
+    'api': 'import app; app.app',
+    'cli': 'from models import create_db_app; create_db_app()',
+    'dashboard': 'import vote_report_dash',
+}
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'modules': len(sys.modules)}}))
+"""
+
+
+def bench_env():
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='startup-bench-'), 'bench.db'))
+    env.setdefault('SECRET_KEY', 'bench-secret')
+    env.setdefault('MAIL_DISPATCHER', 'off')
+    env.setdefault('LOG_ACCESS', '0')
+    return env
+
+
+def run_case(code, env):
+    output = subprocess.run([sys.executable, '-c', PROBE.format(code=code)], cwd=HERE, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def bench_gunicorn(workers, env):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+                              cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+                break
+            except OSError:
+                if server.poll() is not None:
+                    sys.exit('gunicorn exited; is it installed (pip3 install gunicorn)?')
+                time.sleep(0.02)
+        ready = time.perf_counter() - started
+        time.sleep(2)  # let the remaining workers finish booting
+        children = subprocess.run(['pgrep', '-P', str(server.pid)], capture_output=True, text=True).stdout.split()
+        return ready, rss_mb(server.pid), [rss_mb(int(pid)) for pid in children]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', default=','.join(CASES))
+    parser.add_argument('--gunicorn', type=int, metavar='WORKERS', help='also time a gunicorn start with this many workers')
+    opts = parser.parse_args()
+
+    env = bench_env()
+    for name in opts.cases.split(','):
+        runs = [run_case(CASES[name], env) for _ in range(opts.repeat)]
+        print(f"{name:<10} {statistics.median(r['seconds'] for r in runs) * 1000:7.0f} ms  "
+              f"peak RSS {statistics.median(r['rss_mb'] for r in runs):5.0f} MB  "
+              f"{runs[0]['modules']} modules")
+    if opts.gunicorn:
+        ready, master, workers = bench_gunicorn(opts.gunicorn, env)
+        print(f"gunicorn -w {opts.gunicorn}: first response after {ready * 1000:.0f} ms, master {master:.0f} MB, "
+              f"workers {', '.join(f'{w:.0f}' for w in workers)} MB")
+
+
+if __name__ == '__main__':
+    main()
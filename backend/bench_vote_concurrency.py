@@ -0,0 +1,123 @@
+"""Concurrent /vote throughput benchmark: default SQLite settings vs. db_config tuning.
+
+Each mode seeds a fresh database, then starts ``--workers`` processes (like
+``gunicorn -w N``) that cast ballots through the Flask test client with
+``--threads`` request threads each. Example:
+
+    python3 bench_vote_concurrency.py --workers 4 --threads 4 --voters 2000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def seed(path, voters, candidates):
+    conn = sqlite3.connect(path)
+    conn.executemany('INSERT INTO user (id, username, password_hash, role) VALUES (?, ?, ?, ?)',
+                     [(i, f'voter{i}@dktawa.org', 'x', 'user') for i in range(1, voters + 1)])
+    conn.execute("INSERT INTO election (id, title) VALUES (1, 'Benchmark')")
+    conn.executemany('INSERT INTO candidate (id, name, election_id) VALUES (?, ?, 1)',
+                     [(i, f'Candidate {i}') for i in range(1, candidates + 1)])
+    conn.commit()
+    conn.close()
+
+
+def cast_votes(args):
+    user_ids, threads, candidates = args
+    from app import app
+    client_local = threading.local()
+
+    def cast(user_id):
+        client = getattr(client_local, 'client', None)
+        if client is None:
+            client = client_local.client = app.test_client()
+        started = time.perf_counter()
+        try:
+            status = client.post('/vote', json={
+                'user_id': user_id, 'election_id': 1, 'candidate_id': user_id % candidates + 1,
+            }).status_code
+        except Exception:
+            status = 'error'
+        return status, time.perf_counter() - started
+
+    with app.app_context():
+        app.extensions['sqlalchemy'].engine.connect().close()  # open the DB before the clock starts
+    started = time.time()
+    with ThreadPoolExecutor(threads) as pool:
+        outcomes = list(pool.map(cast, user_ids))
+    return started, time.time(), outcomes
+
+
+def run_mode(tuned, opts):
+    workdir = tempfile.mkdtemp(prefix='vote-bench-')
+    path = os.path.join(workdir, 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    os.environ['SQLITE_TUNING'] = '1' if tuned else '0'
+    os.environ['MAIL_DISPATCHER'] = 'off'
+    os.environ.setdefault('LOG_ACCESS', '0')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    os.environ['RESPONSE_CACHE_TTL'] = '0'
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        pool.apply(create_schema)
+    seed(path, opts.voters, opts.candidates)
+    chunks = [list(range(1, opts.voters + 1))[i::opts.workers] for i in range(opts.workers)]
+    with ctx.Pool(opts.workers) as pool:
+        results = pool.map(cast_votes, [(chunk, opts.threads, opts.candidates) for chunk in chunks])
+    # Wall time from the first worker starting to cast until the last one finished
+    elapsed = max(end for _, end, _ in results) - min(start for start, _, _ in results)
+    outcomes = [r for _, _, worker in results for r in worker]
+    latencies = sorted(latency for status, latency in outcomes if status == 200)
+    failures = {}
+    for status, _ in outcomes:
+        if status != 200:
+            failures[str(status)] = failures.get(str(status), 0) + 1
+    conn = sqlite3.connect(path)
+    stored = conn.execute('SELECT COUNT(*) FROM vote').fetchone()[0]
+    conn.close()
+    return {
+        'mode': 'tuned' if tuned else 'default',
+        'ballots': len(outcomes),
+        'accepted': len(latencies),
+        'stored_votes': stored,
+        'failures': failures,
+        'seconds': round(elapsed, 3),
+        'votes_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else None,
+    }
+
+
+def create_schema():
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--voters', type=int, default=2000)
+    parser.add_argument('--candidates', type=int, default=5)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    opts = parser.parse_args()
+    report = [run_mode(False, opts), run_mode(True, opts)]
+    for row in report:
+        print(f"{row['mode']:>8}: {row['accepted']}/{row['ballots']} accepted, "
+              f"{row['votes_per_second']} votes/s, p50 {row['p50_ms']} ms, p95 {row['p95_ms']} ms, "
+              f"failures {row['failures'] or 'none'}")
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
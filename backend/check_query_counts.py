@@ -0,0 +1,118 @@
+"""Fail if the listing endpoints issue more queries as the data grows.
+
+``/elections`` and ``/admin/election_summary`` must answer in a fixed
+number of queries however many elections, candidates, voters and ballots
+there are (no per-election or per-user lookups). This builds a throw-away
+SQLite database, calls each endpoint in ``ENDPOINTS`` through the Flask test
+client with the response cache off, counts the statements it runs with a
+``before_cursor_execute`` listener, grows the data and counts again. It exits
+1 if any count changed.
+
+    python3 check_query_counts.py
+    python3 check_query_counts.py --elections 2,100 --voters 10,5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='query-counts-'), 'counts.db')
+os.environ['RESPONSE_CACHE_TTL'] = '0'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ.setdefault('MAIL_DISPATCHER', 'off')
+os.environ.setdefault('LOG_ACCESS', '0')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+os.environ.setdefault('SECRET_KEY', 'query-counts')
+
+PASSWORD = 'counts-password'
+CANDIDATES_PER_ELECTION = 4
+
+ENDPOINTS = [
+    '/elections',
+    '/elections?limit=5',
+    '/admin/election_summary',
+]
+
+
+def grow(db, elections, voters):
+    """Add elections (with candidates), voters and one ballot per voter per election up to the given totals."""
+    from models import Candidate, Election, User, Vote
+    from password_hashing import hash_password
+    have_elections = db.session.query(db.func.count(Election.id)).scalar()
+    have_voters = db.session.query(db.func.count(User.id)).filter(User.role == 'user').scalar()
+    db.session.execute(db.insert(Election), [{'title': f'Election {e}'} for e in range(have_elections + 1, elections + 1)])
+    db.session.execute(db.insert(Candidate), [
+        {'name': f'Candidate {e}-{c}', 'election_id': e}
+        for e in range(have_elections + 1, elections + 1) for c in range(CANDIDATES_PER_ELECTION)])
+    password_hash = hash_password(PASSWORD)
+    db.session.execute(db.insert(User), [
+        {'username': f'voter{v}@dktawa.org', 'password_hash': password_hash, 'role': 'user'}
+        for v in range(have_voters + 1, voters + 1)])
+    db.session.execute(db.delete(Vote))
+    candidates = db.session.query(Candidate.election_id, db.func.min(Candidate.id)).group_by(Candidate.election_id).all()
+    user_ids = [row[0] for row in db.session.query(User.id).filter(User.role == 'user')]
+    db.session.execute(db.insert(Vote), [
+        {'user_id': user_id, 'election_id': election_id, 'candidate_id': candidate_id}
+        for election_id, candidate_id in candidates for user_id in user_ids])
+    db.session.commit()
+
+
+def count_queries(sizes):
+    """Return {endpoint: [statement count at each (elections, voters) size]}."""
+    from flask import has_request_context
+    from sqlalchemy import event
+    from app import create_app
+    from models import User, db
+    from password_hashing import hash_password
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            statements.append(statement)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='kantwi', password_hash=hash_password(PASSWORD), role='admin'))
+        db.session.commit()
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    client = app.test_client()
+    token = client.post('/login', json={'username': 'kantwi', 'password': PASSWORD}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    counts = {path: [] for path in ENDPOINTS}
+    for elections, voters in sizes:
+        with app.app_context():
+            grow(db, elections, voters)
+        for path in ENDPOINTS:
+            del statements[:]
+            response = client.get(path, headers=headers)
+            if response.status_code != 200:
+                sys.exit(f'GET {path} returned {response.status_code}: {response.get_data(as_text=True)}')
+            counts[path].append(len(statements))
+    with app.app_context():
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--elections', default='2,40', help='election counts for the small and large runs')
+    parser.add_argument('--voters', default='10,1000', help='voter counts for the small and large runs')
+    opts = parser.parse_args()
+
+    sizes = list(zip(*(sorted(int(n) for n in value.split(',')) for value in (opts.elections, opts.voters))))
+    counts = count_queries(sizes)
+    failures = 0
+    for path, per_size in counts.items():
+        fixed = len(set(per_size)) == 1
+        failures += not fixed
+        print(f"{'ok' if fixed else 'GROWS'}  {path}: " + ', '.join(
+            f'{n} queries with {e} elections/{v} voters' for n, (e, v) in zip(per_size, sizes)))
+    print(f'{len(counts)} endpoints checked, {failures} with query counts that grow with the data')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
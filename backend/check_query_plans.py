@@ -0,0 +1,127 @@
+"""Fail if a hot endpoint's query falls back to a full table scan.
+
+Builds a throw-away SQLite database with the migrations (not ``create_all``,
+so missing indexes in a migration are caught), calls each endpoint in
+``HOT_ENDPOINTS`` through the Flask test client with the response cache off,
+and records every statement it runs. Each statement is then explained with
+``EXPLAIN QUERY PLAN``; a ``SCAN <table>`` step that uses no index is a
+failure unless the table is listed in ``FULL_SCAN_OK``.
+
+    python3 check_query_plans.py            # exits 1 on a full scan
+    python3 check_query_plans.py --verbose  # print every plan
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='query-plans-'), 'plans.db')
+os.environ['RESPONSE_CACHE_TTL'] = '0'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ.setdefault('MAIL_DISPATCHER', 'off')
+os.environ.setdefault('LOG_ACCESS', '0')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+os.environ.setdefault('SECRET_KEY', 'query-plans')
+
+PASSWORD = 'plans-password'
+
+# Reading every row is the point of these (tiny) tables
+FULL_SCAN_OK = {
+    'election': '/elections and the summary list every election',
+    'settings': 'a single row of SMTP settings',
+}
+
+HOT_ENDPOINTS = [
+    ('POST', '/login', {'username': 'voter1@dktawa.org', 'password': PASSWORD}),
+    ('GET', '/elections', None),
+    ('POST', '/vote', {'user_id': 3, 'election_id': 1, 'candidate_id': 1}),
+    ('GET', '/results/1', None),
+    ('GET', '/results/1/delta', None),
+    ('GET', '/admin/vote_report/1', None),
+    ('GET', '/admin/elections/1/dashboard', None),
+    ('GET', '/admin/election_summary', None),
+]
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def seed(db):
+    from password_hashing import hash_password
+    tables = db.metadata.tables
+    password_hash = hash_password(PASSWORD)
+    db.session.execute(tables['user'].insert(), [
+        {'username': 'kantwi', 'password_hash': password_hash, 'role': 'admin'},
+        {'username': 'voter1@dktawa.org', 'password_hash': password_hash, 'role': 'user'},
+        {'username': 'voter2@dktawa.org', 'password_hash': password_hash, 'role': 'user'},
+    ])
+    db.session.execute(tables['election'].insert(), [{'title': 'Election 1'}, {'title': 'Election 2'}])
+    db.session.execute(tables['candidate'].insert(), [
+        {'name': f'Candidate {e}-{c}', 'election_id': e} for e in (1, 2) for c in range(3)])
+    # SMTP settings present, so /vote also runs its confirmation-email queries
+    db.session.execute(tables['settings'].insert(), [{'smtp_host': 'localhost', 'smtp_from': 'vote@dktawa.org'}])
+    db.session.commit()
+
+
+def record_statements():
+    from sqlalchemy import event
+    from app import create_app
+    from flask_migrate import upgrade
+    from models import create_db_app, db
+    from flask import has_request_context, request
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and statement.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+            params = parameters[0] if executemany and parameters else parameters
+            statements.append((f'{request.method} {request.path}', statement, params))
+
+    with create_db_app(migrations=True).app_context():
+        upgrade()
+        seed(db)
+    app = create_app()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    client = app.test_client()
+    token = client.post('/login', json={'username': 'kantwi', 'password': PASSWORD}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    for method, path, body in HOT_ENDPOINTS:
+        response = client.open(path, method=method, json=body, headers=headers)
+        if response.status_code != 200:
+            sys.exit(f'{method} {path} returned {response.status_code}: {response.get_data(as_text=True)}')
+    with app.app_context():
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        path = db.engine.url.database
+    return path, statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--verbose', action='store_true', help='print every query plan')
+    opts = parser.parse_args()
+
+    path, statements = record_statements()
+    conn = sqlite3.connect(path)
+    failures = 0
+    seen = set()
+    for endpoint, statement, params in statements:
+        if (endpoint, statement) in seen:
+            continue
+        seen.add((endpoint, statement))
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + statement, params)]
+        scans = [m.group(1) for m in map(FULL_SCAN.match, plan) if m and m.group(1) not in FULL_SCAN_OK]
+        if scans or opts.verbose:
+            print(f"{'FULL SCAN of ' + ', '.join(scans) if scans else 'ok'}  {endpoint}")
+            print('    ' + ' '.join(statement.split()))
+            for step in plan:
+                print(f'      {step}')
+        failures += bool(scans)
+    print(f'{len(seen)} statements from {len(HOT_ENDPOINTS)} endpoints checked, {failures} with full table scans')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
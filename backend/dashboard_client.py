@@ -0,0 +1,86 @@
+"""HTTP client the Dash dashboard uses to talk to the voting API.
+
+One keep-alive ``requests.Session`` (pooled connections) is shared by all
+callbacks, every call has a timeout, and the ``/elections`` payload is
+memoized briefly so several callbacks rendering at once fetch it only once.
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class BackendError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class BackendClient:
+    def __init__(self, base_url, timeout=(3.05, 10), pool_size=16, elections_ttl=5.0,
+                 username=None, password=None, token=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.elections_ttl = elections_ttl
+        self._elections = (0.0, None)
+        self._elections_lock = threading.Lock()
+        self._username = username
+        self._password = password
+        self._token = token
+        self._token_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.environ.get('DASH_BACKEND_URL', 'http://localhost:5001'),
+            timeout=(float(os.environ.get('DASH_CONNECT_TIMEOUT', 3.05)), float(os.environ.get('DASH_READ_TIMEOUT', 10))),
+            elections_ttl=float(os.environ.get('DASH_ELECTIONS_TTL', 5)),
+            username=os.environ.get('DASH_ADMIN_USERNAME', 'kantwi'),
+            password=os.environ.get('DASH_ADMIN_PASSWORD', ''),
+            token=os.environ.get('DASH_API_TOKEN'),
+        )
+
+    def _login(self):
+        resp = self.session.post(f'{self.base_url}/login', json={'username': self._username, 'password': self._password},
+                                 timeout=self.timeout)
+        if resp.status_code != 200:
+            raise BackendError('Dashboard login failed', resp.status_code)
+        return resp.json()['token']
+
+    def _auth_headers(self, refresh=False):
+        with self._token_lock:
+            if (refresh or not self._token) and self._password:
+                self._token = self._login()
+            return {'Authorization': f'Bearer {self._token}'} if self._token else {}
+
+    def get(self, path, params=None, auth=True):
+        """GET ``path`` and return the decoded JSON; raises BackendError on non-200 responses."""
+        url = f'{self.base_url}{path}'
+        headers = self._auth_headers() if auth else {}
+        resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        if resp.status_code == 401 and auth:
+            # Token expired or revoked: log in again once
+            resp = self.session.get(url, params=params, headers=self._auth_headers(refresh=True), timeout=self.timeout)
+        if resp.status_code != 200:
+            try:
+                message = resp.json().get('message')
+            except ValueError:
+                message = None
+            raise BackendError(message or f'HTTP {resp.status_code}', resp.status_code)
+        return resp.json()
+
+    def elections(self):
+        with self._elections_lock:
+            fetched_at, data = self._elections
+            if data is not None and time.monotonic() - fetched_at < self.elections_ttl:
+                return data
+            data = self.get('/elections', auth=False)
+            self._elections = (time.monotonic(), data)
+            return data
+
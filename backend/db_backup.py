@@ -0,0 +1,241 @@
+"""Online backups of the SQLite database while voting continues.
+
+A backup copies the live database with SQLite's online backup API. In WAL
+mode (the default, see ``db_config.py``) the copy is one read transaction:
+it sees a consistent snapshot and takes no write lock, so ``/vote`` keeps
+committing while it runs. In rollback-journal mode the copy proceeds in steps
+of ``pages`` pages, holding the read lock only for each step. The copy is
+checked with ``PRAGMA integrity_check``, gzip-compressed into
+``voting-<UTC timestamp>.db.gz`` with a ``.sha256`` sidecar, and the oldest
+backups beyond ``keep`` are deleted.
+
+Restoring verifies the backup, saves a copy of the current database, then
+writes the backup into the live file through the same backup API, so open
+connections see the restored data instead of a file swapped out under them.
+
+    ./admin_tasks.sh backup
+    ./admin_tasks.sh verify-backup instance/backups/voting-20260101T120000Z.db.gz
+    ./admin_tasks.sh restore instance/backups/voting-20260101T120000Z.db.gz --yes
+
+Set ``BACKUP_INTERVAL_MINUTES`` to also take backups from the API process;
+a lock file makes sure only one gunicorn worker runs each one.
+"""
+import fcntl
+import glob
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+log = logging.getLogger(__name__)
+
+CHUNK = 1024 * 1024
+
+
+class BackupError(Exception):
+    pass
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _integrity_check(path):
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conn.close()
+    if result != 'ok':
+        raise BackupError(f'Integrity check failed for {path}: {result}')
+
+
+def _copy(source_path, dest_path, pages=1024, sleep=0.005, busy_timeout=10):
+    source = sqlite3.connect(source_path, timeout=busy_timeout)
+    dest = sqlite3.connect(dest_path)
+    try:
+        wal = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+        # WAL readers don't block writers, and a single step can't be restarted by their commits
+        source.backup(dest, pages=-1 if wal else pages, sleep=sleep)
+    finally:
+        dest.close()
+        source.close()
+
+
+def list_backups(backup_dir):
+    """Backups in ``backup_dir``, newest first."""
+    return sorted(glob.glob(os.path.join(backup_dir, 'voting-*.db.gz')), reverse=True)
+
+
+def backup(source_path, backup_dir, keep=14, pages=1024, sleep=0.005):
+    """Take, verify, compress and rotate a backup; returns the new backup's path."""
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    target = os.path.join(backup_dir, f'voting-{stamp}.db.gz')
+    fd, snapshot = tempfile.mkstemp(prefix='.snapshot-', suffix='.db', dir=backup_dir)
+    os.close(fd)
+    partial = target + '.partial'
+    try:
+        started = time.monotonic()
+        _copy(source_path, snapshot, pages, sleep)
+        copied = time.monotonic()
+        _integrity_check(snapshot)
+        with open(snapshot, 'rb') as src, gzip.open(partial, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, CHUNK)
+        os.replace(partial, target)
+    finally:
+        for path in (snapshot, partial):
+            if os.path.exists(path):
+                os.remove(path)
+    with open(target + '.sha256', 'w') as f:
+        f.write(f'{_sha256(target)}  {os.path.basename(target)}\n')
+    log.info('Database backup written', extra={
+        'backup': target, 'bytes': os.path.getsize(target),
+        'snapshot_seconds': round(copied - started, 3), 'total_seconds': round(time.monotonic() - started, 3)})
+    for old in list_backups(backup_dir)[keep:]:
+        os.remove(old)
+        if os.path.exists(old + '.sha256'):
+            os.remove(old + '.sha256')
+    return target
+
+
+def _expand(backup_path, dest_path):
+    with gzip.open(backup_path, 'rb') as src, open(dest_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, CHUNK)
+
+
+def verify(backup_path):
+    """Check the checksum sidecar (if present) and the database's integrity."""
+    sidecar = backup_path + '.sha256'
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            expected = f.read().split()[0]
+        if _sha256(backup_path) != expected:
+            raise BackupError(f'Checksum mismatch for {backup_path}')
+    fd, expanded = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        _expand(backup_path, expanded)
+        _integrity_check(expanded)
+    finally:
+        os.remove(expanded)
+
+
+def restore(backup_path, target_path, backup_dir):
+    """Replace the database at ``target_path`` with a backup; the current data is backed up first."""
+    verify(backup_path)
+    saved = backup(target_path, backup_dir, keep=len(list_backups(backup_dir)) + 1) if os.path.exists(target_path) else None
+    fd, expanded = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(os.path.abspath(target_path)))
+    os.close(fd)
+    try:
+        _expand(backup_path, expanded)
+        source = sqlite3.connect(expanded)
+        dest = sqlite3.connect(target_path, timeout=30)
+        try:
+            source.backup(dest)
+        finally:
+            dest.close()
+            source.close()
+    finally:
+        os.remove(expanded)
+    log.info('Database restored', extra={'backup': backup_path, 'target': target_path, 'previous': saved})
+    return saved
+
+
+class BackupScheduler:
+    """Takes a backup every ``interval`` seconds from a daemon thread.
+
+    Several processes may run a scheduler against the same directory: an
+    exclusive lock file plus the age of the newest backup decide which one
+    actually takes it.
+    """
+
+    def __init__(self, source_path, backup_dir, interval, keep=14):
+        self.source_path = source_path
+        self.backup_dir = backup_dir
+        self.interval = interval
+        self.keep = keep
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='db-backup', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run_once(self):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        with open(os.path.join(self.backup_dir, '.lock'), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            newest = list_backups(self.backup_dir)[:1]
+            if newest and time.time() - os.path.getmtime(newest[0]) < self.interval * 0.9:
+                return None
+            return backup(self.source_path, self.backup_dir, self.keep)
+
+    def _run(self):
+        while not self._stopping.wait(min(self.interval, 60)):
+            try:
+                self.run_once()
+            except Exception:
+                log.exception('Scheduled backup failed')
+
+
+def sqlite_path(engine):
+    if engine.dialect.name != 'sqlite' or not engine.url.database or engine.url.database == ':memory:':
+        raise BackupError('Online backups are only supported for SQLite databases; use your database\'s own tools (e.g. pg_dump)')
+    return engine.url.database
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description='Back up, verify or restore the SQLite database.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    take = sub.add_parser('backup')
+    take.add_argument('--dir')
+    take.add_argument('--keep', type=int, default=int(os.environ.get('BACKUP_KEEP', 14)))
+    check = sub.add_parser('verify')
+    check.add_argument('file')
+    back = sub.add_parser('restore')
+    back.add_argument('file')
+    back.add_argument('--dir')
+    back.add_argument('--yes', action='store_true', help='confirm replacing the live database')
+    args = parser.parse_args()
+    try:
+        if args.command == 'verify':
+            verify(args.file)
+            print(f'{args.file}: OK')
+            sys.exit(0)
+        from models import create_db_app, db
+        app = create_db_app()
+        with app.app_context():
+            source = sqlite_path(db.engine)
+        backup_dir = args.dir or os.environ.get('BACKUP_DIR') or os.path.join(app.instance_path, 'backups')
+        if args.command == 'backup':
+            print(f'Backup written to {backup(source, backup_dir, args.keep)}')
+        else:
+            if not args.yes:
+                print(f'This replaces {source} with {args.file}. Re-run with --yes to continue.')
+                sys.exit(1)
+            saved = restore(args.file, source, backup_dir)
+            print(f'Restored {args.file} into {source}' + (f' (previous data saved to {saved})' if saved else ''))
+    except BackupError as e:
+        print(f'Error: {e}')
+        sys.exit(1)
@@ -0,0 +1,74 @@
+"""Database engine configuration.
+
+``DATABASE_URL`` selects the database (defaults to ``instance/voting.db``).
+For SQLite every new connection gets WAL journaling and the pragmas below so
+concurrent gunicorn workers wait for the write lock instead of failing with
+"database is locked". All knobs can be overridden through the environment.
+"""
+import os
+
+from sqlalchemy import event
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'voting.db')
+
+
+def database_uri():
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return 'sqlite:///' + DEFAULT_DB_PATH
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def sqlite_tuning_enabled():
+    return os.environ.get('SQLITE_TUNING', '1') != '0'
+
+
+def sqlite_pragmas():
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000)),
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000)),  # negative = KiB
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'temp_store': 'MEMORY',
+    }
+
+
+def engine_options(uri):
+    pool = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    }
+    if uri.startswith('sqlite'):
+        if not sqlite_tuning_enabled() or ':memory:' in uri or uri.rstrip('/') == 'sqlite:':
+            return {}
+        busy_seconds = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000)) / 1000
+        # Connections are checked out per request thread, never shared concurrently
+        pool['connect_args'] = {'timeout': busy_seconds, 'check_same_thread': False}
+        return pool
+    pool['pool_pre_ping'] = True
+    pool['pool_recycle'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    return pool
+
+
+def configure_database(app):
+    """Fill in the SQLAlchemy settings on ``app`` before the extension is initialized."""
+    uri = database_uri()
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri)
+
+
+def install_sqlite_pragmas(engine):
+    if engine.dialect.name != 'sqlite' or not sqlite_tuning_enabled():
+        return
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
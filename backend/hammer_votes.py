@@ -0,0 +1,90 @@
+"""Concurrency check for /vote: many threads submit ballots for the same voters at once.
+
+Every voter is submitted ``--attempts`` times (for different candidates) from
+``--threads`` threads released together. The run fails (exit code 1) unless
+each voter ends up with exactly one stored vote, exactly one request per voter
+succeeded, every other attempt got the 400 "already voted" response, and the
+tally counters match the vote table.
+
+    python3 hammer_votes.py --voters 200 --attempts 5 --threads 32
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--voters', type=int, default=200)
+    parser.add_argument('--attempts', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--candidates', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='vote-hammer-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'hammer.db')
+    os.environ['MAIL_DISPATCHER'] = 'off'
+    os.environ.setdefault('LOG_ACCESS', '0')
+    os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+    os.environ['DB_POOL_SIZE'] = str(args.threads)
+    from app import app, db, Candidate, Election, User, Vote
+    from reconcile_tallies import reconcile_tallies
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [
+            {'username': f'voter{i}@dktawa.org', 'password_hash': 'x', 'role': 'user'} for i in range(args.voters)
+        ])
+        election = Election(title='Hammer', candidates=[Candidate(name=f'Candidate {i}') for i in range(args.candidates)])
+        db.session.add(election)
+        db.session.commit()
+        election_id = election.id
+        candidate_ids = [c.id for c in election.candidates]
+        user_ids = [u.id for u in User.query.all()]
+
+    ballots = [(user_id, random.choice(candidate_ids)) for user_id in user_ids for _ in range(args.attempts)]
+    random.shuffle(ballots)
+    start = threading.Barrier(min(args.threads, len(ballots)))
+    local = threading.local()
+
+    def cast(ballot):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            start.wait()
+        user_id, candidate_id = ballot
+        response = local.client.post('/vote', json={'user_id': user_id, 'election_id': election_id, 'candidate_id': candidate_id})
+        return user_id, response.status_code, (response.get_json(silent=True) or {}).get('message')
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        outcomes = list(pool.map(cast, ballots))
+
+    errors = []
+    successes = Counter(user_id for user_id, status, _ in outcomes if status == 200)
+    unexpected = Counter((status, message) for _, status, message in outcomes
+                         if status != 200 and not (status == 400 and message == 'User has already voted'))
+    if unexpected:
+        errors.append(f'unexpected responses: {dict(unexpected)}')
+    if set(successes) != set(user_ids) or any(n != 1 for n in successes.values()):
+        errors.append('not exactly one accepted ballot per voter')
+    with app.app_context():
+        stored = Counter(user_id for (user_id,) in db.session.query(Vote.user_id).filter_by(election_id=election_id))
+        if set(stored) != set(user_ids) or any(n != 1 for n in stored.values()):
+            errors.append('not exactly one stored vote per voter')
+        drift = reconcile_tallies(check_only=True)
+        if drift:
+            errors.append(f'tally counters drifted: {drift}')
+
+    print(f'{len(ballots)} ballots from {args.threads} threads for {len(user_ids)} voters: '
+          f'{sum(successes.values())} accepted, {len(ballots) - sum(successes.values())} rejected')
+    for error in errors:
+        print('FAIL:', error)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
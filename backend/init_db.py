@@ -1,5 +1,9 @@
-from app import db, app
+import logging
 
-with app.app_context():
-    db.create_all()
-    print('Database initialized.')
+from flask_migrate import upgrade
+
+from models import create_db_app
+
+with create_db_app(migrations=True).app_context():
+    upgrade()
+    logging.getLogger('init_db').info('Database initialized.')
@@ -0,0 +1,153 @@
+"""Live tally updates shared by all viewers in a process.
+
+One ``TallyWatcher`` thread per process polls the election version counters
+(``election_stats.total_votes`` plus ``revision``, which adding or removing a
+candidate bumps) for the elections someone is watching and reloads an
+election's tallies only when its version moves. A changed candidate list is
+sent as a full ``snapshot`` event rather than a ``delta``. Viewers, whether
+Server-Sent Event streams or clients polling the delta endpoint, read from
+that shared snapshot, so the database work grows with the number of changes
+rather than with the number of viewers.
+"""
+import json
+import queue
+import threading
+import time
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class TallyWatcher:
+    def __init__(self, load_versions, load_tallies, interval=1.0, idle_timeout=120, app=None):
+        """``load_versions(ids)`` returns {election_id: version};
+        ``load_tallies(id)`` returns {candidate name: {'votes': n, 'photo_url': url}}.
+        Both are called inside an app context (``app``, or the one given to ``init_app``) on the watcher thread."""
+        self.app = app
+        self.load_versions = load_versions
+        self.load_tallies = load_tallies
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._snapshots = {}  # election_id -> (version, tallies)
+        self._last_used = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def _ensure_running(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name='tally-watcher', daemon=True)
+                self._thread.start()
+
+    def _load(self, election_id):
+        with self.app.app_context():
+            version = self.load_versions([election_id]).get(election_id, 0)
+            return version, self.load_tallies(election_id)
+
+    def snapshot(self, election_id):
+        """Return (version, tallies), loading the election on first use."""
+        self._ensure_running()
+        with self._lock:
+            self._last_used[election_id] = time.monotonic()
+            current = self._snapshots.get(election_id)
+        if current is None:
+            current = self._load(election_id)
+            with self._lock:
+                current = self._snapshots.setdefault(election_id, current)
+        return current
+
+    def subscribe(self, election_id):
+        events = queue.Queue(maxsize=64)
+        with self._lock:
+            self._subscribers.setdefault(election_id, set()).add(events)
+        return events
+
+    def unsubscribe(self, election_id, events):
+        with self._lock:
+            self._subscribers.get(election_id, set()).discard(events)
+
+    def notify(self, election_id):
+        """Ask for an immediate re-check (e.g. right after a vote commits in this process)."""
+        if election_id in self._snapshots:
+            self._wakeup.set()
+
+    def stream(self, election_id, heartbeat=15):
+        """Generate an SSE stream: one 'snapshot' event, then a 'delta' per change."""
+        events = self.subscribe(election_id)
+        try:
+            version, tallies = self.snapshot(election_id)
+            yield sse_event('snapshot', {'version': version, 'tallies': tallies})
+            while True:
+                try:
+                    event, data = events.get(timeout=heartbeat)
+                except queue.Empty:
+                    with self._lock:
+                        self._last_used[election_id] = time.monotonic()
+                    yield ': keep-alive\n\n'
+                    continue
+                if data['version'] <= version:
+                    continue
+                version = data['version']
+                yield sse_event(event, data)
+        finally:
+            self.unsubscribe(election_id, events)
+
+    def _publish(self, election_id, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(election_id, ()))
+        for events in subscribers:
+            try:
+                events.put_nowait((event, data))
+            except queue.Full:
+                # Slow client: drop its backlog and resend the full state
+                while not events.empty():
+                    try:
+                        events.get_nowait()
+                    except queue.Empty:
+                        break
+                version, tallies = self._snapshots[election_id]
+                events.put_nowait(('snapshot', {'version': version, 'tallies': tallies}))
+
+    def poll_once(self):
+        now = time.monotonic()
+        with self._lock:
+            for election_id in [e for e, used in self._last_used.items()
+                                if now - used > self.idle_timeout and not self._subscribers.get(e)]:
+                self._last_used.pop(election_id, None)
+                self._snapshots.pop(election_id, None)
+            watched = list(self._snapshots)
+        if not watched:
+            return
+        with self.app.app_context():
+            versions = self.load_versions(watched)
+            for election_id in watched:
+                old_version, old_tallies = self._snapshots.get(election_id, (None, None))
+                version = versions.get(election_id, 0)
+                if old_tallies is None or version == old_version:
+                    continue
+                tallies = self.load_tallies(election_id)
+                self._snapshots[election_id] = (version, tallies)
+                if tallies.keys() != old_tallies.keys():
+                    # Candidates added or removed: new names need their photos, so resend everything
+                    self._publish(election_id, 'snapshot', {'version': version, 'tallies': tallies})
+                    continue
+                changes = {name: t['votes'] for name, t in tallies.items()
+                           if old_tallies[name]['votes'] != t['votes']}
+                self._publish(election_id, 'delta', {'version': version, 'changes': changes, 'removed': []})
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.poll_once()
+            except Exception:
+                self.app.logger.exception('Tally watcher poll failed')
@@ -0,0 +1,146 @@
+"""Structured logging for the API and admin scripts.
+
+``configure_logging()`` puts a ``QueueHandler`` on the root logger: request
+threads only append records to an in-memory queue, and one ``QueueListener``
+thread formats them (JSON by default) and writes them to stderr. Values under
+sensitive keys (passwords, tokens, SMTP credentials) are redacted, and records
+logged during a request carry its request id.
+
+``init_request_logging(app)`` assigns each request an id (the incoming
+``X-Request-ID`` header or a new one), echoes it back in the response, and
+writes one access-log line per request with its status and duration.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+SENSITIVE_KEYS = {'password', 'new_password', 'current_password', 'password_hash', 'smtp_password',
+                  'token', 'authorization', 'secret', 'secret_key', 'api_key'}
+REDACTED = '[redacted]'
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+_listener = None
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if str(k).lower() in SENSITIVE_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        entry.update(redact({k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS}))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+        return super().format(record)
+
+
+class RequestContextFilter(logging.Filter):
+    """Runs in the logging thread's caller, where the request context is available."""
+
+    def filter(self, record):
+        if has_request_context() and 'request_id' in g:
+            record.request_id = g.request_id
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Resolve the message and traceback now, but keep extra fields for the formatter
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level=None, fmt=None):
+    """Route all logging through a background listener; safe to call more than once."""
+    global _listener
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(TextFormatter() if (fmt or os.environ.get('LOG_FORMAT', 'json')) == 'text' else JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    if hasattr(os, 'register_at_fork'):
+        # e.g. gunicorn --preload: the listener thread does not survive the fork
+        os.register_at_fork(after_in_child=_restart_listener)
+
+
+def _restart_listener():
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+def init_request_logging(app, access_log=True):
+    access = logging.getLogger('access')
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get('X-Request-ID', '')
+        g.request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        if access_log and 'request_started' in g:
+            access.info('%s %s %s', request.method, request.path, response.status_code, extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2),
+                'remote_addr': request.remote_addr,
+            })
+        return response
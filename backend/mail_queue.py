@@ -0,0 +1,245 @@
+"""Background delivery of queued emails (vote confirmations etc.).
+
+Messages are written to the ``mail_outbox`` table in the same transaction as
+the change that triggers them and delivered later by ``MailDispatcher``,
+either from a daemon thread inside the API process or from a standalone
+worker (``python3 mail_queue.py``).
+"""
+import logging
+import smtplib
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+
+log = logging.getLogger(__name__)
+
+SMTPConfig = namedtuple('SMTPConfig', 'host port user password sender tls')
+
+
+def smtp_config_from_settings(smtp):
+    return SMTPConfig(smtp.smtp_host, smtp.smtp_port, smtp.smtp_user,
+                      smtp.smtp_password, smtp.smtp_from, bool(smtp.smtp_tls))
+
+
+def connection_lost(error):
+    """True for connection-level failures; a refused recipient or message leaves the session usable."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # SMTPException subclasses OSError; only plain socket errors mean the connection is gone
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPPool:
+    """Keeps authenticated SMTP connections around for reuse."""
+
+    def __init__(self, max_idle=4, idle_timeout=60, timeout=10, factory=smtplib.SMTP):
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.factory = factory
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, config):
+        server = self.factory(config.host, config.port, timeout=self.timeout)
+        if config.tls:
+            server.starttls()
+        if config.user:
+            server.login(config.user, config.password)
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def acquire(self, config):
+        while True:
+            with self._lock:
+                idle = self._idle.get(config)
+                entry = idle.pop() if idle else None
+            if entry is None:
+                return self._connect(config)
+            server, released_at = entry
+            if time.monotonic() - released_at > self.idle_timeout:
+                self._close(server)
+                continue
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except Exception:
+                pass
+            self._close(server)
+
+    def release(self, config, server, broken=False):
+        if not broken:
+            with self._lock:
+                idle = self._idle.setdefault(config, [])
+                if len(idle) < self.max_idle:
+                    idle.append((server, time.monotonic()))
+                    return
+        self._close(server)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for entries in idle.values():
+            for server, _ in entries:
+                self._close(server)
+
+
+class MailDispatcher:
+    """Claims due outbox rows in batches and sends them over pooled connections.
+
+    Failed sends are retried with exponential backoff until ``max_attempts``
+    is reached, after which the row is marked ``failed``. Claims use a
+    per-batch token so several dispatchers (one per gunicorn worker, or a
+    separate worker process) can share the same outbox.
+    """
+
+    def __init__(self, db, outbox_model, settings_model, app=None, pool=None, batch_size=20,
+                 poll_interval=5.0, max_attempts=5, backoff_base=5.0, backoff_max=600.0,
+                 stale_after=300.0, observe_send=None):
+        self.app = app
+        self.db = db
+        self.outbox = outbox_model
+        self.settings = settings_model
+        self.pool = pool or SMTPPool()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stale_after = stale_after
+        self.observe_send = observe_send  # called with (seconds, ok) after each SMTP attempt
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app, start=False):
+        """Bind to ``app``; ``start=True`` also starts the delivery thread, so rows left
+        pending by a previous process are sent without waiting for a new message."""
+        self.app = app
+        if start:
+            self.start()
+
+    def enqueue(self, to_addr, subject, body):
+        """Add a message to the current session; it is persisted on the caller's commit."""
+        message = self.outbox(to_addr=to_addr, subject=subject, body=body)
+        self.db.session.add(message)
+        return message
+
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self.run_forever, name='mail-dispatcher', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.pool.close_all()
+
+    def run_forever(self):
+        while not self._stopping.is_set():
+            try:
+                handled = self.dispatch_once()
+            except Exception:
+                self.app.logger.exception('Mail dispatcher iteration failed')
+                handled = 0
+            if not handled:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def backoff(self, attempts):
+        return min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+
+    def _claim(self, now):
+        Outbox = self.outbox
+        stale = now - timedelta(seconds=self.stale_after)
+        due = self.db.or_(
+            self.db.and_(Outbox.status == 'pending', Outbox.next_attempt_at <= now),
+            self.db.and_(Outbox.status == 'sending', Outbox.claimed_at < stale),
+        )
+        ids = [row.id for row in self.db.session.query(Outbox.id).filter(due)
+               .order_by(Outbox.id).limit(self.batch_size)]
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        Outbox.query.filter(Outbox.id.in_(ids), due).update(
+            {'status': 'sending', 'claim_token': token, 'claimed_at': now},
+            synchronize_session=False)
+        self.db.session.commit()
+        return Outbox.query.filter_by(claim_token=token).order_by(Outbox.id).all()
+
+    def dispatch_once(self):
+        """Send one batch of due messages. Returns how many rows were handled."""
+        with self.app.app_context():
+            now = datetime.utcnow()
+            batch = self._claim(now)
+            if not batch:
+                return 0
+            smtp = self.settings.query.first()
+            config = smtp_config_from_settings(smtp) if smtp and smtp.smtp_host else None
+            server = None
+            for message in batch:
+                message.attempts += 1
+                started = time.perf_counter()
+                try:
+                    if config is None:
+                        raise RuntimeError('SMTP is not configured')
+                    if server is None:
+                        server = self.pool.acquire(config)
+                    msg = MIMEText(message.body)
+                    msg['Subject'] = message.subject
+                    msg['From'] = config.sender
+                    msg['To'] = message.to_addr
+                    server.sendmail(config.sender, [message.to_addr], msg.as_string())
+                except Exception as e:
+                    if config is not None and self.observe_send:
+                        self.observe_send(time.perf_counter() - started, False)
+                    if server is not None and connection_lost(e):
+                        self.pool.release(config, server, broken=True)
+                        server = None
+                    message.last_error = str(e)
+                    if message.attempts >= self.max_attempts:
+                        message.status = 'failed'
+                    else:
+                        message.status = 'pending'
+                        message.next_attempt_at = now + timedelta(seconds=self.backoff(message.attempts))
+                else:
+                    if self.observe_send:
+                        self.observe_send(time.perf_counter() - started, True)
+                    message.status = 'sent'
+                    message.sent_at = datetime.utcnow()
+                    message.last_error = None
+                message.claim_token = None
+            if server is not None:
+                self.pool.release(config, server)
+            self.db.session.commit()
+            return len(batch)
+
+
+if __name__ == '__main__':
+    # Standalone worker: run with MAIL_DISPATCHER=off on the API processes.
+    from models import MailOutbox, Settings, create_db_app, db
+    dispatcher = MailDispatcher(db, MailOutbox, Settings, app=create_db_app())
+    log.info('Mail dispatcher running (Ctrl+C to stop)')
+    try:
+        dispatcher.run_forever()
+    except KeyboardInterrupt:
+        dispatcher.stop()
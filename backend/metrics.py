@@ -0,0 +1,220 @@
+"""Request metrics in Prometheus text format, plus an opt-in per-request profiler.
+
+``RequestMetrics.init_app(app, engine)`` hooks Flask's request lifecycle and
+SQLAlchemy's cursor events, so every route is measured without touching the
+handlers: latency per endpoint, SQL statements and SQL time per request,
+in-flight requests, and any timings reported through ``observe_smtp_send``.
+Metrics are kept per process; with several gunicorn workers each scrape sees
+the worker that answered it.
+
+A request sent with ``X-Profile: <PROFILE_TOKEN>`` runs under cProfile and
+its stats are saved to ``PROFILE_DIR``; the file name comes back in the
+``X-Profile-File`` response header. Profiling is off unless PROFILE_TOKEN is
+set, and only one request is profiled at a time.
+"""
+import cProfile
+import hmac
+import os
+import threading
+import time
+import uuid
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [f'{self.name}{_labels(self.labelnames, k)} {_number(v)}'
+                                for k, v in sorted(values.items())]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            counts, total = self._values.get(labels, (None, 0.0))
+            if counts is None:
+                counts = [0] * len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[labels] = (counts, total + value)
+
+    def render(self):
+        with self._lock:
+            values = {k: (list(counts), total) for k, (counts, total) in self._values.items()}
+        lines = self.header()
+        for labels, (counts, total) in sorted(values.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(bound))])} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {counts[-1]}')
+        return lines
+
+
+class RequestMetrics:
+    def __init__(self, profile_token=None, profile_dir=None):
+        self.profile_token = profile_token
+        self.profile_dir = profile_dir
+        self._profile_lock = threading.Lock()
+        self.requests = Counter('http_requests_total', 'HTTP requests handled.', ['method', 'endpoint', 'status'])
+        self.latency = Histogram('http_request_duration_seconds', 'Time spent handling a request.',
+                                 ['method', 'endpoint'])
+        self.in_flight = Gauge('http_requests_in_flight', 'Requests currently being handled.')
+        self.sql_queries = Histogram('http_request_sql_queries', 'SQL statements executed per request.',
+                                     ['endpoint'], buckets=COUNT_BUCKETS)
+        self.sql_time = Histogram('http_request_sql_seconds', 'Time spent in SQL per request.', ['endpoint'])
+        self.sql_statements = Counter('sql_statements_total', 'SQL statements executed, in or outside requests.')
+        self.smtp_send = Histogram('smtp_send_seconds', 'Time to send one email over SMTP.', ['outcome'])
+        self.metrics = [self.requests, self.latency, self.in_flight, self.sql_queries,
+                        self.sql_time, self.sql_statements, self.smtp_send]
+
+    @classmethod
+    def from_env(cls):
+        return cls(profile_token=os.environ.get('PROFILE_TOKEN') or None,
+                   profile_dir=os.environ.get('PROFILE_DIR'))
+
+    def init_app(self, app, engine, metrics_token=None):
+        """Instrument ``app`` and ``engine`` and add the ``/metrics`` route."""
+        if self.profile_dir is None:
+            self.profile_dir = os.path.join(app.instance_path, 'profiles')
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+        def metrics_endpoint():
+            if metrics_token and not hmac.compare_digest(
+                    request.headers.get('Authorization', '').encode(), f'Bearer {metrics_token}'.encode()):
+                return Response('Unauthorized\n', status=401, mimetype='text/plain')
+            return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+        app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def observe_smtp_send(self, seconds, ok=True):
+        self.smtp_send.observe(seconds, 'ok' if ok else 'error')
+
+    @staticmethod
+    def _endpoint():
+        rule = request.url_rule
+        return rule.rule if rule is not None else '<unmatched>'
+
+    def _before_request(self):
+        self.in_flight.inc()
+        g.metrics = {'started': time.perf_counter(), 'queries': 0, 'sql_seconds': 0.0, 'status': 500}
+        if self.profile_token and hmac.compare_digest(request.headers.get('X-Profile', '').encode(),
+                                                      self.profile_token.encode()):
+            if self._profile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                g.metrics['profiler'] = profiler
+                profiler.enable()
+
+    def _after_request(self, response):
+        state = g.get('metrics')
+        if state is None:
+            return response
+        state['status'] = response.status_code
+        profiler = state.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{uuid.uuid4().hex[:8]}.prof"
+            profiler.dump_stats(os.path.join(self.profile_dir, filename))
+            response.headers['X-Profile-File'] = filename
+        return response
+
+    def _teardown_request(self, exc):
+        state = g.pop('metrics', None)
+        if state is None:
+            return
+        profiler = state.pop('profiler', None)
+        if profiler is not None:  # after_request never ran
+            profiler.disable()
+            self._profile_lock.release()
+        self.in_flight.dec()
+        endpoint = self._endpoint()
+        self.requests.inc(request.method, endpoint, str(state['status']))
+        self.latency.observe(time.perf_counter() - state['started'], request.method, endpoint)
+        self.sql_queries.observe(state['queries'], endpoint)
+        self.sql_time.observe(state['sql_seconds'], endpoint)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['metrics_query_started'].pop()
+        self.sql_statements.inc()
+        if has_request_context():
+            state = g.get('metrics')
+            if state is not None:
+                state['queries'] += 1
+                state['sql_seconds'] += time.perf_counter() - started
+
+    def _handle_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('metrics_query_started'):
+            conn.info['metrics_query_started'].pop()
@@ -0,0 +1,141 @@
+"""initial schema
+
+The schema as ``db.create_all()`` built it before migrations were added.
+Databases created that way have no ``alembic_version`` table, so this
+revision only creates the tables and indexes that are missing: running
+``upgrade`` on an existing ``voting.db`` adopts it without touching data.
+Vote counters it creates there are filled from the ballots already cast.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 06:28:00.876410
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *columns):
+    if sa.inspect(op.get_bind()).has_table(name):
+        return False
+    op.create_table(name, *columns)
+    return True
+
+
+def upgrade():
+    _create_table('election',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('mail_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('to_addr', sa.String(length=128), nullable=False),
+    sa.Column('subject', sa.String(length=256), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_mail_outbox_claim_token', 'mail_outbox', ['claim_token'], unique=False, if_not_exists=True)
+    op.create_index('ix_mail_outbox_due', 'mail_outbox', ['status', 'next_attempt_at'], unique=False, if_not_exists=True)
+
+    _create_table('settings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('smtp_host', sa.String(length=128), nullable=True),
+    sa.Column('smtp_port', sa.Integer(), nullable=True),
+    sa.Column('smtp_user', sa.String(length=128), nullable=True),
+    sa.Column('smtp_password', sa.String(length=128), nullable=True),
+    sa.Column('smtp_from', sa.String(length=128), nullable=True),
+    sa.Column('smtp_tls', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_table('user',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=80), nullable=False),
+    sa.Column('password_hash', sa.String(length=128), nullable=False),
+    sa.Column('role', sa.String(length=16), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('username')
+    )
+    _create_table('candidate',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=80), nullable=False),
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('photo_url', sa.String(length=256), nullable=True),
+    sa.ForeignKeyConstraint(['election_id'], ['election.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    new_stats = _create_table('election_stats',
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('total_votes', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['election_id'], ['election.id'], ),
+    sa.PrimaryKeyConstraint('election_id')
+    )
+    new_tallies = _create_table('candidate_tally',
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('votes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidate.id'], ),
+    sa.ForeignKeyConstraint(['election_id'], ['election.id'], ),
+    sa.PrimaryKeyConstraint('candidate_id')
+    )
+    op.create_index('ix_candidate_tally_election_id', 'candidate_tally', ['election_id'], unique=False, if_not_exists=True)
+
+    _create_table('vote',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidate.id'], ),
+    sa.ForeignKeyConstraint(['election_id'], ['election.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'election_id', name='unique_vote')
+    )
+    op.create_index('ix_vote_election_candidate', 'vote', ['election_id', 'candidate_id'], unique=False, if_not_exists=True)
+
+    # A database from before the counters already has ballots; count them in
+    if new_tallies:
+        op.execute(
+            'INSERT INTO candidate_tally (candidate_id, election_id, votes) '
+            'SELECT candidate.id, candidate.election_id, COUNT(*) FROM vote '
+            'JOIN candidate ON candidate.id = vote.candidate_id AND candidate.election_id = vote.election_id '
+            'GROUP BY candidate.id, candidate.election_id'
+        )
+    if new_stats:
+        op.execute(sa.text(
+            'INSERT INTO election_stats (election_id, total_votes, updated_at) '
+            'SELECT election_id, COUNT(*), :now FROM vote GROUP BY election_id'
+        ).bindparams(now=datetime.utcnow()))
+
+
+def downgrade():
+    op.drop_index('ix_vote_election_candidate', table_name='vote')
+    op.drop_table('vote')
+    op.drop_index('ix_candidate_tally_election_id', table_name='candidate_tally')
+    op.drop_table('candidate_tally')
+    op.drop_table('election_stats')
+    op.drop_table('candidate')
+    op.drop_table('user')
+    op.drop_table('settings')
+    op.drop_index('ix_mail_outbox_due', table_name='mail_outbox')
+    op.drop_index('ix_mail_outbox_claim_token', table_name='mail_outbox')
+    op.drop_table('mail_outbox')
+    op.drop_table('election')
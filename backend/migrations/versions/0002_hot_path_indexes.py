@@ -0,0 +1,29 @@
+"""index candidate.election_id
+
+Every per-election read (results, vote report, dashboard, the /elections
+candidate lists) filters candidates by election; without this index each one
+scans the whole candidate table. ``check_query_plans.py`` fails if it is
+missing.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 06:40:12.512316
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: databases made by db.create_all() already have it
+    op.create_index('ix_candidate_election_id', 'candidate', ['election_id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_candidate_election_id', table_name='candidate')
@@ -0,0 +1,30 @@
+"""add election_stats.revision
+
+Adding or removing a candidate bumps it, so the live-results version
+(total_votes + revision) moves and open streams and /delta pollers pick up
+the new candidate list without waiting for a vote.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 07:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('election_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('election_stats', schema=None) as batch_op:
+        batch_op.drop_column('revision')
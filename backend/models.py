@@ -0,0 +1,140 @@
+"""Database models, shared by the API and the command-line tools.
+
+``db`` is bound to an app by ``app.create_app()`` for the API, or by
+``create_db_app()`` for scripts: that builds an app with only the database,
+without importing the API and its services, so tools stay cheap to start.
+
+    python3 -m flask --app 'models:create_db_app(migrations=True)' db upgrade
+"""
+import os
+from datetime import datetime
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
+
+from db_config import configure_database, install_sqlite_pragmas
+from log_config import configure_logging
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+db = SQLAlchemy()
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password_hash = db.Column(db.String(128), nullable=False)
+    role = db.Column(db.String(16), nullable=False, default='user')  # 'admin' or 'user'
+
+class Election(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(120), nullable=False)
+    candidates = db.relationship('Candidate', backref='election', order_by='Candidate.id')
+
+class Candidate(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), nullable=False, index=True)
+    photo_url = db.Column(db.String(256), nullable=True)  # URL or filename for candidate photo
+
+class Vote(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), nullable=False)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id'), nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'election_id', name='unique_vote'),
+        db.Index('ix_vote_election_candidate', 'election_id', 'candidate_id'),
+    )
+
+# Materialized counters, bumped in the same transaction as each Vote insert.
+# Rebuild them from the vote table with `./admin_tasks.sh reconcile-tallies`.
+class CandidateTally(db.Model):
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id'), primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), nullable=False, index=True)
+    votes = db.Column(db.Integer, nullable=False, default=0)
+
+class ElectionStats(db.Model):
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), primary_key=True)
+    total_votes = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped when candidates are added or removed; version = total_votes + revision
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Settings(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    smtp_host = db.Column(db.String(128))
+    smtp_port = db.Column(db.Integer)
+    smtp_user = db.Column(db.String(128))
+    smtp_password = db.Column(db.String(128))
+    smtp_from = db.Column(db.String(128))
+    smtp_tls = db.Column(db.Boolean, default=True)
+
+class MailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    to_addr = db.Column(db.String(128), nullable=False)
+    subject = db.Column(db.String(256), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='pending')  # 'pending', 'sending', 'sent' or 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32), index=True)
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    __table_args__ = (db.Index('ix_mail_outbox_due', 'status', 'next_attempt_at'),)
+
+def dialect_insert(model):
+    """INSERT construct with ON CONFLICT support for the configured database."""
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
+
+def record_votes(election_id, candidate_id, count=1):
+    """Bump the materialized counters in the current transaction (committed with the votes)."""
+    now = datetime.utcnow()
+    stmt = dialect_insert(CandidateTally).values(candidate_id=candidate_id, election_id=election_id, votes=count)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['candidate_id'], set_={'votes': CandidateTally.votes + count}))
+    stmt = dialect_insert(ElectionStats).values(election_id=election_id, total_votes=count, updated_at=now)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['election_id'], set_={'total_votes': ElectionStats.total_votes + count, 'updated_at': now}))
+
+def bump_revision(election_id):
+    """Move the election's results version without a vote (candidate list changed), in the current transaction."""
+    now = datetime.utcnow()
+    stmt = dialect_insert(ElectionStats).values(election_id=election_id, total_votes=0, revision=1, updated_at=now)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['election_id'], set_={'revision': ElectionStats.revision + 1, 'updated_at': now}))
+
+def backfill_tallies():
+    """Fill empty counter tables from the vote table, one grouped INSERT ... SELECT each."""
+    per_candidate = (
+        db.select(Candidate.id, Candidate.election_id, db.func.count(Vote.id))
+        .join(Vote, db.and_(Vote.candidate_id == Candidate.id, Vote.election_id == Candidate.election_id))
+        .group_by(Candidate.id, Candidate.election_id)
+    )
+    db.session.execute(db.insert(CandidateTally).from_select(['candidate_id', 'election_id', 'votes'], per_candidate))
+    per_election = db.select(Vote.election_id, db.func.count(Vote.id), db.literal(datetime.utcnow(), db.DateTime)).group_by(
+        Vote.election_id)
+    db.session.execute(db.insert(ElectionStats).from_select(['election_id', 'total_votes', 'updated_at'], per_election))
+
+def create_db_app(migrations=False):
+    """Flask app with only ``db`` bound (no routes or background services).
+
+    ``migrations=True`` also registers the ``flask db`` commands, which imports
+    Alembic; only the migration paths need it.
+    """
+    # JSON logs via a background queue listener (LOG_LEVEL, LOG_FORMAT, LOG_ACCESS)
+    configure_logging()
+    app = Flask('app', root_path=os.path.dirname(os.path.abspath(__file__)))
+    # DATABASE_URL, pool and SQLite pragma settings live in db_config.py
+    configure_database(app)
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine)
+    if migrations:
+        # Schema changes are Alembic migrations in migrations/ (`./admin_tasks.sh migrate-db`)
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+    return app
@@ -0,0 +1,151 @@
+"""Password hashing service.
+
+All password hashes are created and checked here, with one configured method
+(``PASSWORD_HASH_METHOD``, any werkzeug method such as
+``pbkdf2:sha256:1000000`` or ``scrypt:32768:8:1``). The CPU-heavy work runs in
+a small process pool, so API threads wait on a future (without holding the
+GIL) instead of burning their worker's CPU, and at most ``max_pending`` hashes
+queue up before callers get ``HasherBusy``. Hashes made with other parameters
+are flagged by ``verify_and_update`` so ``/login`` can upgrade them in place.
+
+``calibrate()`` reports the PBKDF2 iteration count that takes about a given
+time on this host:
+
+    python3 password_hashing.py --target-ms 250
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'pbkdf2:sha256:1000000'
+
+
+class HasherBusy(Exception):
+    """Too many hash operations are already queued."""
+
+
+def configured_method():
+    return os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+
+def method_prefix(method):
+    """The method part werkzeug stores in front of the salt, with defaults filled in."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS}"
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    return method
+
+
+def hash_password(password, method=None):
+    return generate_password_hash(password, method=method or configured_method())
+
+
+def _verify_and_update(stored_hash, password, method, prefix):
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if stored_hash.split('$', 1)[0] != prefix:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self, method=None, workers=2, max_pending=32, wait_timeout=10.0):
+        """``workers=0`` hashes on the calling thread (scripts, single-user tools)."""
+        self.method = method or configured_method()
+        self.method_prefix = method_prefix(self.method)
+        self.workers = workers
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1))),
+            max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32)),
+        )
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn, not fork: the API process runs background threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise HasherBusy('Password hashing queue is full')
+        try:
+            return self._executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash a batch (bulk imports) on the same pool, returning hashes in order.
+
+        Only ``workers`` hashes of the batch are queued at a time, so a login
+        arriving meanwhile waits behind a few of them, not the whole batch.
+        """
+        if not self.workers:
+            return [hash_password(password, self.method) for password in passwords]
+        window, hashes = deque(), []
+        for password in passwords:
+            if len(window) >= self.workers:
+                hashes.append(window.popleft().result())
+            self._slots.acquire()
+            try:
+                future = self._executor().submit(hash_password, password, self.method)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda _: self._slots.release())
+            window.append(future)
+        hashes.extend(future.result() for future in window)
+        return hashes
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self.method_prefix
+
+    def verify_and_update(self, stored_hash, password):
+        """Return (valid, new_hash); new_hash is set when the stored hash uses old parameters."""
+        return self._run(_verify_and_update, stored_hash, password, self.method, self.method_prefix)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+def calibrate(target_seconds=0.25, algorithm='sha256'):
+    """Return a PBKDF2 iteration count that takes roughly ``target_seconds`` here."""
+    iterations = 100000
+    started = time.perf_counter()
+    generate_password_hash('calibration', method=f'pbkdf2:{algorithm}:{iterations}')
+    elapsed = time.perf_counter() - started
+    return max(100000, int(iterations * target_seconds / elapsed) // 10000 * 10000)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Suggest a PBKDF2 cost for this host.')
+    parser.add_argument('--target-ms', type=float, default=250)
+    args = parser.parse_args()
+    iterations = calibrate(args.target_ms / 1000)
+    print(f'PASSWORD_HASH_METHOD=pbkdf2:sha256:{iterations}  (~{args.target_ms:.0f} ms per hash on this host)')
@@ -0,0 +1,166 @@
+"""Token-bucket rate limiting for the expensive public endpoints.
+
+Each rule is a bucket of ``N`` requests per period for one key scope: the
+client IP, or a field of the JSON body such as ``username`` or ``user_id``.
+Buckets refill continuously, so a limit of ``10/minute`` allows a burst of 10
+and then one request every 6 seconds. Limits are checked before the handler
+runs, so rejected requests never reach password hashing or the database.
+
+Limits given in code can be overridden per route and scope with
+``RATE_LIMIT_<ROUTE>_<SCOPE>`` (e.g. ``RATE_LIMIT_LOGIN_IP=60/minute``, or
+``0`` to drop that rule). Buckets live in process memory; with
+``RATE_LIMIT_REDIS_URL`` (or ``REDIS_URL``) set they are shared by all
+gunicorn workers. If Redis is unreachable requests are let through.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+log = logging.getLogger(__name__)
+
+
+def parse_limit(spec):
+    """``'10/minute'`` or ``'10/60'`` -> (capacity, refill per second); None if disabled."""
+    spec = str(spec).strip().lower()
+    if spec in ('', '0', 'off', 'none'):
+        return None
+    count, _, period = spec.partition('/')
+    seconds = int(period) if period.isdigit() else PERIODS.get(period.rstrip('s'))
+    if not seconds or int(count) <= 0:
+        raise ValueError(f'Invalid rate limit: {spec!r}')
+    return int(count), int(count) / seconds
+
+
+class MemoryBackend:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take one token; return 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        # Buckets idle for an hour are (nearly always) full again; then drop least recently used
+        stale = [k for k, (_, updated) in self._buckets.items() if now - updated > 3600]
+        for key in stale:
+            del self._buckets[key]
+        if len(self._buckets) > self.max_keys:
+            for key, _ in sorted(self._buckets.items(), key=lambda item: item[1][1])[:len(self._buckets) - self.max_keys]:
+                del self._buckets[key]
+
+
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Buckets shared across workers (requires the ``redis`` package)."""
+
+    def __init__(self, url, prefix='voting:ratelimit:'):
+        import redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.prefix = prefix
+        self._take = self.client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key, capacity, rate):
+        return float(self._take(keys=[self.prefix + key], args=[capacity, rate, time.time()]))
+
+
+def _json_field(name):
+    def key():
+        value = (request.get_json(silent=True) or {}).get(name)
+        return str(value).strip().lower() if value not in (None, '') else None
+    return key
+
+
+SCOPES = {
+    'ip': lambda: request.remote_addr,
+    'username': _json_field('username'),
+    'user_id': _json_field('user_id'),
+}
+
+
+class RateLimiter:
+    def __init__(self, backend, enabled=True):
+        self.backend = backend
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls):
+        enabled = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+        redis_url = os.environ.get('RATE_LIMIT_REDIS_URL') or os.environ.get('REDIS_URL')
+        return cls(RedisBackend(redis_url) if redis_url else MemoryBackend(), enabled)
+
+    def check(self, route, rules):
+        """Return seconds to wait if any rule is exhausted, else 0."""
+        for scope, (capacity, rate) in rules:
+            value = SCOPES[scope]()
+            if value is None:
+                continue
+            try:
+                wait = self.backend.take(f'{route}:{scope}:{value}', capacity, rate)
+            except Exception:
+                log.warning('Rate limit backend unavailable; allowing request', exc_info=True)
+                return 0
+            if wait:
+                return wait
+        return 0
+
+    def limit(self, route, **defaults):
+        """Decorator: ``@rate_limiter.limit('login', ip='600/minute', username='10/minute')``."""
+        rules = []
+        for scope, spec in defaults.items():
+            if scope not in SCOPES:
+                raise ValueError(f'Unknown rate limit scope: {scope}')
+            parsed = parse_limit(os.environ.get(f'RATE_LIMIT_{route.upper()}_{scope.upper()}', spec))
+            if parsed:
+                rules.append((scope, parsed))
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.enabled and rules:
+                    wait = self.check(route, rules)
+                    if wait:
+                        response = jsonify({'message': 'Too many requests, please try again later'})
+                        return response, 429, {'Retry-After': str(max(1, math.ceil(wait)))}
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
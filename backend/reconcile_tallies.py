@@ -0,0 +1,63 @@
+import sys
+
+from datetime import datetime
+
+from models import db, Candidate, CandidateTally, ElectionStats, Vote, backfill_tallies, create_db_app, dialect_insert
+
+def lock_for_recount():
+    """Take the write lock before reading anything, so no ballot commits between the reads and the rebuild."""
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('LOCK TABLE vote, candidate_tally, election_stats IN SHARE ROW EXCLUSIVE MODE'))
+    elif db.engine.dialect.name == 'sqlite':
+        # pysqlite only opens a transaction before a write; start one that already holds the lock
+        db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+
+def diff(stored, counted):
+    """[(key, stored, counted)] over keys present on either side."""
+    return [(key, stored.get(key, 0), counted.get(key, 0)) for key in sorted(stored.keys() | counted.keys())
+            if stored.get(key, 0) != counted.get(key, 0)]
+
+def reconcile_tallies(check_only=False):
+    """Rebuild candidate/election counters from the vote table and return the drift found.
+
+    The write lock is taken first, so the stored counters, the recount and
+    the rebuild all see the same votes.
+    """
+    lock_for_recount()
+    stored_candidates = {t.candidate_id: t.votes for t in CandidateTally.query.all()}
+    stats = ElectionStats.query.all()
+    stored_elections = {s.election_id: s.total_votes for s in stats}
+    revisions = {s.election_id: s.revision for s in stats if s.revision}
+    counted_candidates = dict(
+        db.session.query(Candidate.id, db.func.count(Vote.id))
+        .join(Vote, db.and_(Vote.candidate_id == Candidate.id, Vote.election_id == Candidate.election_id))
+        .group_by(Candidate.id)
+        .all()
+    )
+    counted_elections = dict(db.session.query(Vote.election_id, db.func.count(Vote.id)).group_by(Vote.election_id).all())
+    drift = [('candidate', *d) for d in diff(stored_candidates, counted_candidates)]
+    drift += [('election', *d) for d in diff(stored_elections, counted_elections)]
+    if check_only:
+        db.session.rollback()
+        return drift
+    CandidateTally.query.delete()
+    ElectionStats.query.delete()
+    backfill_tallies()
+    # Keep candidate-change revisions, so results versions never move backwards
+    now = datetime.utcnow()
+    for election_id, revision in revisions.items():
+        stmt = dialect_insert(ElectionStats).values(election_id=election_id, total_votes=0, revision=revision, updated_at=now)
+        db.session.execute(stmt.on_conflict_do_update(index_elements=['election_id'], set_={'revision': revision}))
+    db.session.commit()
+    return drift
+
+if __name__ == '__main__':
+    check_only = '--check' in sys.argv[1:]
+    with create_db_app().app_context():
+        drift = reconcile_tallies(check_only)
+    for kind, key, stored, actual in drift:
+        print(f'{kind} {key}: counter={stored} votes={actual}')
+    if check_only:
+        print(f'{len(drift)} counters drifted.' if drift else 'Counters match the vote table.')
+        sys.exit(1 if drift else 0)
+    print(f'Tallies rebuilt ({len(drift)} counters corrected).')
@@ -1,20 +1,23 @@
-from app import db, User
-from werkzeug.security import generate_password_hash
+import logging
+
+from models import create_db_app, db, User
+from password_hashing import hash_password
+
+log = logging.getLogger('reset_admin_password')
 
 def reset_admin_password(new_password):
     admin = User.query.filter_by(username='kantwi').first()
     if not admin:
-        print('Admin user not found!')
+        log.error('Admin user not found!')
         return
-    admin.password_hash = generate_password_hash(new_password, method='pbkdf2:sha256')
+    admin.password_hash = hash_password(new_password)
     db.session.commit()
-    print('Admin password updated successfully.')
+    log.info('Admin password updated successfully.')
 
 if __name__ == '__main__':
     import os
     new_pw = os.environ.get('NEW_ADMIN_PASSWORD')
     if not new_pw:
         new_pw = input('Enter new admin password: ')
-    from app import app
-    with app.app_context():
+    with create_db_app().app_context():
         reset_admin_password(new_pw)
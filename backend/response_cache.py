@@ -0,0 +1,135 @@
+"""Read-through cache for JSON responses with ETag support.
+
+Entries are grouped into namespaces (e.g. ``elections`` or ``results:3``).
+Invalidating a namespace bumps its generation counter, which makes every key
+built under the old generation unreachable; they then age out of the LRU or
+expire through their TTL. With ``REDIS_URL`` set, entries and generations
+live in Redis so all gunicorn workers see the same invalidations.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, current_app, request
+
+
+class MemoryBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class RedisBackend:
+    """Shared store for multi-worker deployments (requires the ``redis`` package)."""
+
+    def __init__(self, url, prefix='voting:cache:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        meta, _, body = raw.partition(b'\n')
+        meta = json.loads(meta)
+        return body, meta['etag'], meta['headers']
+
+    def set(self, key, value, ttl):
+        body, etag, headers = value
+        meta = json.dumps({'etag': etag, 'headers': headers}).encode()
+        self.client.set(self.prefix + key, meta + b'\n' + body, ex=max(int(ttl), 1))
+
+    def generation(self, namespace):
+        return int(self.client.get(self.prefix + 'gen:' + namespace) or 0)
+
+    def bump(self, namespace):
+        self.client.incr(self.prefix + 'gen:' + namespace)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl=30):
+        self.backend = backend
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls):
+        ttl = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+        redis_url = os.environ.get('REDIS_URL')
+        if redis_url:
+            return cls(RedisBackend(redis_url), ttl)
+        return cls(MemoryBackend(int(os.environ.get('RESPONSE_CACHE_SIZE', 512))), ttl)
+
+    @property
+    def shared(self):
+        """True when other processes (API workers, scripts) see this cache's invalidations."""
+        return isinstance(self.backend, RedisBackend)
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+
+    def respond(self, namespace, key, build):
+        """Return a cached JSON response for ``key``, calling ``build()`` on a miss.
+
+        ``build`` returns the payload to serialize, or a ``(payload, headers)``
+        tuple. Clients that send a matching ``If-None-Match`` get an empty 304.
+        """
+        cache_key = f'{namespace}:{self.backend.generation(namespace)}:{key}'
+        entry = self.backend.get(cache_key) if self.ttl > 0 else None
+        if entry is None:
+            payload, headers = build(), {}
+            if isinstance(payload, tuple):
+                payload, headers = payload
+            body = current_app.json.dumps(payload).encode() + b'\n'
+            entry = (body, hashlib.sha1(body).hexdigest(), headers)
+            if self.ttl > 0:
+                self.backend.set(cache_key, entry, self.ttl)
+        body, etag, headers = entry
+        response = Response(body, mimetype='application/json', headers=headers)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
@@ -0,0 +1,57 @@
+"""Shared fixtures: one API app on a throw-away SQLite database, emptied between tests."""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix='voting-tests-')
+# Before app.py is imported: its services read the environment at import time
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(WORKDIR, 'test.db'),
+    'EXPORT_DIGEST_DIR': os.path.join(WORKDIR, 'export-digests'),
+    'SECRET_KEY': 'test-secret',
+    'MAIL_DISPATCHER': 'off',
+    'LOG_ACCESS': '0',
+    'LOG_FORMAT': 'text',
+    'RATE_LIMIT_ENABLED': '0',
+    'RESPONSE_CACHE_TTL': '0',
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'PASSWORD_HASH_WORKERS': '0',
+    'LIVE_RESULTS_INTERVAL': '0.05',
+})
+
+ADMIN_PASSWORD = 'admin-password'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    return create_app()
+
+
+@pytest.fixture
+def db(app):
+    from models import db
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_headers(client, db):
+    from models import User
+    from password_hashing import hash_password
+    db.session.add(User(username='kantwi', password_hash=hash_password(ADMIN_PASSWORD), role='admin'))
+    db.session.commit()
+    token = client.post('/login', json={'username': 'kantwi', 'password': ADMIN_PASSWORD}).get_json()['token']
+    return {'Authorization': f'Bearer {token}'}
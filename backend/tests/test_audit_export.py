@@ -0,0 +1,28 @@
+import json
+
+from models import Candidate, Election, User, Vote
+
+
+def test_ballots_export_keeps_votes_for_deleted_candidates(client, db, admin_headers):
+    election = Election(title='Board')
+    db.session.add(election)
+    db.session.flush()
+    kept, dropped = Candidate(name='Kept', election_id=election.id), Candidate(name='Dropped', election_id=election.id)
+    voters = [User(username=f'voter{i}@dktawa.org', password_hash='x', role='user') for i in range(3)]
+    db.session.add_all([kept, dropped, *voters])
+    db.session.flush()
+    db.session.add_all([Vote(user_id=voters[0].id, election_id=election.id, candidate_id=kept.id),
+                        Vote(user_id=voters[1].id, election_id=election.id, candidate_id=dropped.id),
+                        Vote(user_id=voters[2].id, election_id=election.id, candidate_id=dropped.id)])
+    db.session.commit()
+    dropped_id = dropped.id
+
+    assert client.delete(f'/candidates/{dropped_id}', headers=admin_headers).status_code == 200
+    response = client.get('/admin/export/ballots?format=jsonl', headers=admin_headers)
+
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == Vote.query.count() == 3
+    orphaned = [row for row in rows if row['candidate_id'] == dropped_id]
+    assert len(orphaned) == 2
+    assert all(row['candidate_name'] is None and row['election_title'] == 'Board' for row in orphaned)
@@ -0,0 +1,42 @@
+import json
+import queue
+import threading
+
+from models import Candidate, Election
+
+
+def read_events(response):
+    """Queue the stream's SSE events as (event, data) from a background reader, skipping keep-alives."""
+    events = queue.Queue()
+
+    def reader():
+        for chunk in response.response:
+            text = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if text.startswith('event:'):
+                lines = dict(line.split(': ', 1) for line in text.strip().splitlines())
+                events.put((lines['event'], json.loads(lines['data'])))
+
+    threading.Thread(target=reader, daemon=True).start()
+    return events
+
+
+def test_candidate_add_reaches_open_stream(client, db, admin_headers):
+    election = Election(title='Board')
+    db.session.add(election)
+    db.session.flush()
+    db.session.add(Candidate(name='Old', election_id=election.id))
+    db.session.commit()
+
+    response = client.get(f'/results/{election.id}/stream', headers=admin_headers)
+    events = read_events(response)
+    event, data = events.get(timeout=5)
+    assert event == 'snapshot' and set(data['tallies']) == {'Old'}
+
+    added = client.post(f'/elections/{election.id}/candidates', json={'name': 'New'}, headers=admin_headers)
+    assert added.status_code == 200
+    event, data = events.get(timeout=5)
+    assert event == 'snapshot'
+    assert set(data['tallies']) == {'Old', 'New'}
+
+    delta = client.get(f'/results/{election.id}/delta?since={data["version"]}', headers=admin_headers).get_json()
+    assert delta['changed'] is False
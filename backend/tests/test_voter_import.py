@@ -0,0 +1,30 @@
+import json
+
+from voter_import import validate
+
+
+def test_validate_rejects_non_string_fields():
+    assert validate({'username': 123, 'password': ['x']}) == (None, 'username and password must be strings')
+    assert validate({'username': 'a@dktawa.org', 'password': {'x': 1}})[0] is None
+    assert validate({'username': None, 'password': 'pw'}) == (None, 'Missing username or password')
+    assert validate({'username': ' a@dktawa.org ', 'password': 'pw'}) == (('a@dktawa.org', 'pw'), None)
+
+
+def test_import_reports_non_string_rows_and_keeps_going(client, admin_headers):
+    rows = [
+        {'username': 'one@dktawa.org', 'password': 'pw1'},
+        {'username': 123, 'password': ['x']},
+        {'username': 'two@dktawa.org', 'password': ['x']},
+        {'username': {'name': 'x'}, 'password': 'pw'},
+        {'username': 'three@dktawa.org', 'password': 'pw3'},
+    ]
+    body = ''.join(json.dumps(row) + '\n' for row in rows)
+    response = client.post('/admin/import_voters?format=jsonl', data=body, headers=admin_headers)
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report['imported'] == 2
+    assert report['failed'] == 3
+    assert [f['line'] for f in report['failures']] == [2, 3, 4]
+    assert {f['error'] for f in report['failures']} == {'username and password must be strings'}
+    assert client.post('/login', json={'username': 'three@dktawa.org', 'password': 'pw3'}).status_code == 200
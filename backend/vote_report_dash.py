@@ -1,15 +1,41 @@
 import dash
 from dash import dcc, html
 import dash_bootstrap_components as dbc
-import plotly.express as px
-import requests
-from dash.dependencies import Input, Output
+import os
+from plotly.colors import qualitative
+from dash.dependencies import Input, Output, State
 
-# Configuration
-BACKEND_URL = 'http://localhost:5000/admin/vote_report/'  # Adjust if backend runs elsewhere
+from dashboard_client import BackendClient, BackendError
+
+# Configuration: DASH_BACKEND_URL, timeouts and admin credentials are read in dashboard_client.py
+backend = BackendClient.from_env()
+LIVE_REFRESH_MS = int(os.environ.get('DASH_LIVE_REFRESH_MS', 3000))
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
+# Figures are plain dicts built from these templates: no pandas or plotly.express per redraw
+CANDIDATE_COLORS = qualitative.Safe
+RESULTS_LAYOUT = {
+    'plot_bgcolor': 'white',
+    'paper_bgcolor': 'white',
+    'font': {'family': 'Inter, sans-serif', 'size': 16},
+    'margin': {'l': 80, 'r': 30, 't': 10, 'b': 40},
+    'xaxis': {'title': {'text': 'Votes'}, 'showgrid': True, 'gridcolor': '#eee', 'zeroline': False},
+    'yaxis': {'title': {'text': 'Candidate'}, 'showgrid': False, 'type': 'category'},
+    'showlegend': False,
+}
+SUMMARY_SERIES = [('Eligible Voters', 'voters', '#1976d2'), ('Voted', 'voted', '#43a047'), ('Candidates', 'candidates', '#ffa000')]
+SUMMARY_LAYOUT = {
+    'barmode': 'group',
+    'plot_bgcolor': 'white',
+    'paper_bgcolor': 'white',
+    'font': {'family': 'Inter, sans-serif', 'size': 15},
+    'margin': {'l': 50, 'r': 30, 't': 10, 'b': 40},
+    'xaxis': {'title': {'text': 'Election'}, 'showgrid': False, 'type': 'category'},
+    'yaxis': {'title': {'text': 'Count'}, 'showgrid': True, 'gridcolor': '#eee', 'zeroline': False},
+    'legend': {'orientation': 'h', 'yanchor': 'bottom', 'y': 1.02, 'xanchor': 'right', 'x': 1},
+}
+
 app.layout = dbc.Container([
     dbc.Row([
         dbc.Col([
@@ -18,6 +44,9 @@ app.layout = dbc.Container([
                 dbc.CardBody([
                     html.P('Select an election to view results, candidate votes, and participation statistics.', className='mb-4'),
                     dcc.Dropdown(id='election-dropdown', placeholder='Select election...', style={'marginBottom': 24}),
+                    # Live refresh: poll the cheap delta endpoint, redraw only when the tally version moves
+                    dcc.Interval(id='results-interval', interval=LIVE_REFRESH_MS),
+                    dcc.Store(id='results-version'),
                     dbc.Row([
                         dbc.Col([
                             dcc.Graph(id='results-bar', config={'displayModeBar': False}),
@@ -48,10 +77,7 @@ app.layout = dbc.Container([
 )
 def load_elections(_):
     try:
-        resp = requests.get('http://localhost:5001/elections')
-        if resp.status_code != 200:
-            return [], None
-        data = resp.json()
+        data = backend.elections()
         options = [{'label': e['title'], 'value': e['id']} for e in data]
         return options, options[0]['value'] if options else None
     except Exception:
@@ -61,85 +87,67 @@ def load_elections(_):
     Output('results-bar', 'figure'),
     Output('results-summary', 'children'),
     Output('results-error', 'children'),
-    Input('election-dropdown', 'value')
+    Output('results-version', 'data'),
+    Input('election-dropdown', 'value'),
+    Input('results-interval', 'n_intervals'),
+    State('results-version', 'data')
 )
-def update_results(election_id):
-    import pandas as pd
+def update_results(election_id, _, seen):
     if not election_id:
-        return {}, '', ''
+        return {}, '', '', None
+    # Interval ticks for the same election only ask whether the tallies changed
+    since = seen['version'] if seen and seen.get('election_id') == election_id else None
     try:
-        # Get election/candidates info
-        elections_resp = requests.get('http://localhost:5001/elections')
-        elections = elections_resp.json()
-        election = next((e for e in elections if e['id'] == election_id), None)
-        if not election:
-            return {}, '', 'Election not found.'
-        candidates = election['candidates']
-        # Get results
-        results_resp = requests.get(f'http://localhost:5001/results/{election_id}?username=kantwi')
-        if results_resp.status_code != 200:
-            return {}, '', 'Unauthorized or no results.'
-        results = results_resp.json()
-        # Get summary stats
-        summary_resp = requests.get('http://localhost:5000/admin/election_summary', headers={'username': 'kantwi'})
-        summary = summary_resp.json()
-        summ = next((s for s in summary if s['title'] == election['title']), None)
-        # Prepare bar chart data
-        df = pd.DataFrame([
-            {
-                'Candidate': c['name'],
-                'Votes': results.get(c['name'], {}).get('votes', 0),
-                'Photo': c.get('photo_url')
-            } for c in candidates
-        ])
-        fig = px.bar(
-            df,
-            x='Votes',
-            y='Candidate',
-            orientation='h',
-            text='Votes',
-            color='Candidate',
-            color_discrete_sequence=px.colors.qualitative.Safe
-        )
-        fig.update_traces(
-            textposition='outside',
-            hovertemplate='<b>%{y}</b><br>Votes: %{x}<extra></extra>'
-        )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(family='Inter, sans-serif', size=16),
-            margin=dict(l=80, r=30, t=10, b=40),
-            xaxis=dict(showgrid=True, gridcolor='#eee', zeroline=False),
-            yaxis=dict(showgrid=False),
-            showlegend=False
-        )
+        try:
+            if since is not None and not backend.get(f'/results/{election_id}/delta', params={'since': since})['changed']:
+                return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+            # One call returns candidates, votes, photos and turnout for this election only
+            view = backend.get(f'/admin/elections/{election_id}/dashboard')
+        except BackendError as e:
+            if e.status_code == 404:
+                return {}, '', 'Election not found.', None
+            return {}, '', f'Unauthorized or no results ({e}).', None
+        version = {'election_id': election_id, 'version': view['version']}
+        candidates = view['candidates']
+        names = [c['name'] for c in candidates]
+        votes = [c['votes'] for c in candidates]
+        layout = RESULTS_LAYOUT
         # Candidate avatars
         photos = [c.get('photo_url') for c in candidates]
         if any(photos):
-            fig.update_layout(
-                yaxis_tickmode='array',
-                yaxis_tickvals=df['Candidate'],
-                yaxis_ticktext=[
+            layout = dict(layout, yaxis=dict(
+                layout['yaxis'],
+                tickmode='array',
+                tickvals=names,
+                ticktext=[
                     f'<img src="{p}" style="height:32px;width:32px;border-radius:50%;vertical-align:middle;margin-right:8px;"> {n}' if p else n
-                    for n, p in zip(df['Candidate'], photos)
+                    for n, p in zip(names, photos)
                 ]
-            )
+            ))
+        fig = {
+            'data': [{
+                'type': 'bar',
+                'orientation': 'h',
+                'x': votes,
+                'y': names,
+                'text': votes,
+                'textposition': 'outside',
+                'marker': {'color': [CANDIDATE_COLORS[i % len(CANDIDATE_COLORS)] for i in range(len(names))]},
+                'hovertemplate': '<b>%{y}</b><br>Votes: %{x}<extra></extra>',
+            }],
+            'layout': layout,
+        }
         # Summary stats
-        if summ:
-            turnout = (summ['voted'] / summ['voters'] * 100) if summ['voters'] else 0
-            summary_html = html.Div([
-                html.H5('Election Stats', style={'color': '#1976d2', 'marginBottom': 10}),
-                html.P(f"Eligible Voters: {summ['voters']}", style={'marginBottom': 2}),
-                html.P(f"Voted: {summ['voted']}", style={'marginBottom': 2}),
-                html.P(f"Candidates: {summ['candidates']}", style={'marginBottom': 2}),
-                html.P(f"Turnout: {turnout:.1f}%", style={'fontWeight': 600, 'color': '#43a047'})
-            ])
-        else:
-            summary_html = ''
-        return fig, summary_html, ''
+        summary_html = html.Div([
+            html.H5('Election Stats', style={'color': '#1976d2', 'marginBottom': 10}),
+            html.P(f"Eligible Voters: {view['voters']}", style={'marginBottom': 2}),
+            html.P(f"Voted: {view['voted']}", style={'marginBottom': 2}),
+            html.P(f"Candidates: {len(candidates)}", style={'marginBottom': 2}),
+            html.P(f"Turnout: {view['turnout']:.1f}%", style={'fontWeight': 600, 'color': '#43a047'})
+        ])
+        return fig, summary_html, '', version
     except Exception as e:
-        return {}, '', f'Error: {str(e)}'
+        return {}, '', f'Error: {str(e)}', None
 
 @app.callback(
     [Output('summary-bar', 'figure'), Output('summary-error', 'children')],
@@ -147,83 +155,21 @@ def update_results(election_id):
 )
 def update_summary(_):
     try:
-        resp = requests.get('http://localhost:5000/admin/election_summary', headers={'username': 'kantwi'})
-        if resp.status_code != 200:
-            return dash.no_update, f'Error: {resp.json().get("message", "Unauthorized or not found")}'
-        data = resp.json()
+        try:
+            data = backend.get('/admin/election_summary')
+        except BackendError as e:
+            return dash.no_update, f'Error: {e}'
         if not data:
             return dash.no_update, 'No elections found.'
         titles = [e['title'] for e in data]
-        voters = [e['voters'] for e in data]
-        voted = [e['voted'] for e in data]
-        candidates = [e['candidates'] for e in data]
-        import pandas as pd
-        df = pd.DataFrame({
-            'Election': titles * 3,
-            'Count': voters + voted + candidates,
-            'Category': ['Eligible Voters'] * len(titles) + ['Voted'] * len(titles) + ['Candidates'] * len(titles)
-        })
-        fig = px.bar(
-            df,
-            x='Election',
-            y='Count',
-            color='Category',
-            barmode='group',
-            text_auto=True,
-            color_discrete_map={
-                'Eligible Voters': '#1976d2',
-                'Voted': '#43a047',
-                'Candidates': '#ffa000'
-            },
-            category_orders={'Category': ['Eligible Voters', 'Voted', 'Candidates']}
-        )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(family='Inter, sans-serif', size=15),
-            margin=dict(l=50, r=30, t=10, b=40),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor='#eee', zeroline=False),
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1)
-        )
-        fig.update_traces(textposition='outside')
-        return fig, ''
-    except Exception as e:
-        return dash.no_update, f'Error: {str(e)}'
-
-@app.callback(
-    [Output('bar-chart', 'figure'), Output('error-msg', 'children')],
-    [Input('bar-chart', 'id')]
-)
-def update_chart(_):
-    election_id = 1  # DKT WELFARE
-    try:
-        resp = requests.get(f'{BACKEND_URL}{election_id}', headers={'username': 'kantwi'})
-        if resp.status_code != 200:
-            return dash.no_update, f'Error: {resp.json().get("message", "Unauthorized or not found")}'
-        data = resp.json()
-        if not data:
-            return dash.no_update, 'No data for this election.'
-        names = list(data.keys())
-        votes = list(data.values())
-        fig = px.bar(
-            x=votes,
-            y=names,
-            orientation='h',
-            labels={'x': 'Votes', 'y': 'Candidate'},
-            title='',
-            color=names,
-            color_discrete_sequence=px.colors.qualitative.Safe
-        )
-        fig.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(family='Inter, sans-serif', size=16),
-            margin=dict(l=80, r=30, t=10, b=40),
-            xaxis=dict(showgrid=True, gridcolor='#eee', zeroline=False),
-            yaxis=dict(showgrid=False),
-            showlegend=False
-        )
+        fig = {
+            'data': [
+                {'type': 'bar', 'name': label, 'x': titles, 'y': [e[key] for e in data], 'text': [e[key] for e in data],
+                 'textposition': 'outside', 'marker': {'color': color}}
+                for label, key, color in SUMMARY_SERIES
+            ],
+            'layout': SUMMARY_LAYOUT,
+        }
         return fig, ''
     except Exception as e:
         return dash.no_update, f'Error: {str(e)}'
@@ -0,0 +1,180 @@
+"""Bulk voter registration from CSV or JSON Lines.
+
+Each record needs ``username`` and ``password``; the same rules as
+``/register`` apply. Input is read as a stream and processed in chunks: one
+``SELECT ... IN`` per chunk to find existing usernames, passwords hashed by a
+``PasswordHasher`` (the API's shared pool, or one process per core from the
+command line), and one ``executemany`` INSERT per chunk, so memory stays
+bounded by the chunk size however large the file is.
+
+    python3 voter_import.py voters.csv
+    ./admin_tasks.sh import-voters voters.jsonl
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from sqlalchemy.exc import IntegrityError
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def detect_format(filename, default='csv'):
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_records(stream, fmt):
+    """Yield (line_number, record or None, error) from a text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f'Invalid JSON: {e}'
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, 'Expected a JSON object'
+                continue
+            yield line_number, record, None
+    else:
+        raise ValueError(f'Unsupported format: {fmt}')
+
+
+def validate(record):
+    username, password = record.get('username'), record.get('password')
+    # JSON Lines can carry numbers, lists or objects; CSV gives None for missing columns
+    if not isinstance(username, (str, type(None))) or not isinstance(password, (str, type(None))):
+        return None, 'username and password must be strings'
+    username = (username or '').strip()
+    password = password or ''
+    if not username or not password:
+        return None, 'Missing username or password'
+    # Same restriction as /register
+    if not (username == 'kantwi' or username.endswith('@dktawa.org')):
+        return None, 'Registration restricted: Only kantwi or dktawa.org emails allowed'
+    return (username, password), None
+
+
+class ImportReport:
+    def __init__(self, max_failures=1000, on_failure=None):
+        self.imported = 0
+        self.failed = 0
+        self.failures = []
+        self.max_failures = max_failures
+        self.on_failure = on_failure
+
+    def fail(self, line, username, error):
+        self.failed += 1
+        failure = {'line': line, 'username': username, 'error': error}
+        if len(self.failures) < self.max_failures:
+            self.failures.append(failure)
+        if self.on_failure:
+            self.on_failure(failure)
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            'failures': self.failures,
+            'failures_truncated': self.failed > len(self.failures),
+        }
+
+
+def _existing_usernames(db, users, usernames):
+    rows = db.session.execute(db.select(users.c.username).where(users.c.username.in_(usernames)))
+    return {row[0] for row in rows}
+
+
+def _import_chunk(db, users, hasher, chunk, report):
+    candidates = {}
+    for line, record, error in chunk:
+        if error:
+            report.fail(line, None, error)
+            continue
+        values, error = validate(record)
+        if error:
+            report.fail(line, record.get('username'), error)
+        elif values[0] in candidates:
+            report.fail(line, values[0], 'Duplicate username in file')
+        else:
+            candidates[values[0]] = (line, values[1])
+    for _ in range(2):
+        existing = _existing_usernames(db, users, list(candidates)) if candidates else set()
+        for username in existing:
+            line, _ = candidates.pop(username)
+            report.fail(line, username, 'Username already exists')
+        if not candidates:
+            return
+        usernames = list(candidates)
+        hashes = hasher.hash_many([candidates[u][1] for u in usernames])
+        rows = [
+            {'username': u, 'password_hash': h, 'role': 'admin' if u == 'kantwi' else 'user'}
+            for u, h in zip(usernames, hashes)
+        ]
+        try:
+            db.session.execute(users.insert(), rows)
+            db.session.commit()
+        except IntegrityError:
+            # Someone registered one of these names meanwhile; re-check and retry once
+            db.session.rollback()
+            continue
+        report.imported += len(rows)
+        return
+    for username, (line, _) in candidates.items():
+        report.fail(line, username, 'Could not insert user')
+
+
+def import_voters(db, stream, hasher, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE, on_failure=None):
+    """Import voters from a text stream, hashing with ``hasher``; must run inside an app context."""
+    users = db.metadata.tables['user']
+    report = ImportReport(on_failure=on_failure)
+    records = read_records(stream, fmt)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(db, users, hasher, chunk, report)
+    return report
+
+
+def text_stream(binary):
+    """Wrap a binary (request or file) stream for line-by-line decoding."""
+    if not isinstance(binary, io.BufferedIOBase):
+        binary = io.BufferedReader(binary)
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Bulk-register voters from a CSV or JSONL file.')
+    parser.add_argument('file')
+    parser.add_argument('--format', choices=['csv', 'jsonl'])
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, help='hashing processes (default: one per core)')
+    args = parser.parse_args()
+    import os
+    from models import create_db_app, db
+    from password_hashing import PasswordHasher
+    from response_cache import ResponseCache
+    fmt = args.format or detect_format(args.file)
+    # A standalone run can use every core; the API shares its bounded pool instead
+    hasher = PasswordHasher(workers=args.workers or os.cpu_count())
+    with create_db_app().app_context(), open(args.file, encoding='utf-8-sig', newline='') as f:
+        report = import_voters(db, f, hasher, fmt, args.chunk_size,
+                               on_failure=lambda f: print(f"line {f['line']}: {f['username'] or '-'}: {f['error']}"))
+    hasher.shutdown()
+    cache = ResponseCache.from_env()
+    if cache.shared:  # a private in-memory cache here would not reach the API workers
+        cache.invalidate('summary')
+    print(f'Imported {report.imported} voters, {report.failed} failed.')
@@ -53,7 +53,13 @@ function App() {
 
   const handleLogin = () => {
     axios.post(`${api}/login`, { username, password })
-      .then(res => { setUserId(res.data.user_id); setRole(res.data.role); setView('dashboard'); })
+      .then(res => {
+        // Session token authorizes every later API call
+        axios.defaults.headers.common['Authorization'] = `Bearer ${res.data.token}`;
+        setUserId(res.data.user_id);
+        setRole(res.data.role);
+        setView('dashboard');
+      })
       .catch(e => setError(e.response?.data?.message || 'Login failed'));
   };
 
@@ -83,14 +89,8 @@ function App() {
     axios.post(`${api}/vote`, { user_id: userId, election_id: electionId, candidate_id: candidateId })
       .then(res => {
         let msg = 'Vote cast!';
-        if (typeof res.data.email_sent !== 'undefined') {
-          if (res.data.email_sent) {
-            msg += ' Confirmation email sent.';
-          } else {
-            msg += ' (Email not sent';
-            if (res.data.email_error) msg += ': ' + res.data.email_error;
-            msg += ')';
-          }
+        if (res.data.email_status === 'queued') {
+          msg += ' A confirmation email is on its way.';
         }
         setVoteMsg(msg);
       })
@@ -102,6 +102,8 @@ function App() {
   // Navigation handler for DashboardLayout
   const handleNav = (target) => {
     if (target === 'logout') {
+      axios.post(`${api}/logout`).catch(() => {});
+      delete axios.defaults.headers.common['Authorization'];
       setUserId(null);
       setUsername('');
       setPassword('');
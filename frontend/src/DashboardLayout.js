@@ -4,6 +4,7 @@ import DashboardIcon from '@mui/icons-material/Dashboard';
 import HowToVoteIcon from '@mui/icons-material/HowToVote';
 import AddBoxIcon from '@mui/icons-material/AddBox';
 import LogoutIcon from '@mui/icons-material/Logout';
+import axios from 'axios';
 
 const drawerWidth = 220;
 
@@ -15,10 +16,8 @@ export default function DashboardLayout({ selected, onSelect, children, username
   const [users, setUsers] = useState([]);
   useEffect(() => {
     if (isAdmin && username) {
-      fetch(`http://localhost:5001/users?username=${encodeURIComponent(username)}`)
-        .then(async res => {
-          if (res.ok) setUsers(await res.json());
-        })
+      axios.get(`http://localhost:5001/users?username=${encodeURIComponent(username)}`)
+        .then(res => setUsers(res.data))
         .catch(() => {});
     }
   }, [isAdmin, username]);